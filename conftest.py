@@ -0,0 +1 @@
+# Keeps the repository root importable (e.g. `shared.segmented`) when running `pytest` from the root.
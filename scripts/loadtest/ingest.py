@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Concurrent load test for data-capture /ingest.
+
+Run against a live stack and compare requests/sec before and after a change, e.g.
+    python scripts/loadtest/ingest.py --url http://localhost:8001 --requests 200 --concurrency 20
+
+Each upload is unique (a per-run, per-request prefix), so every request goes through encryption and the
+MinIO write. Pass --duplicate to send identical bodies and measure the content-addressed dedup path.
+"""
+
+import argparse
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+NONCE_SIZE = 24
+
+
+def body_for(payload: bytes, run_id: bytes, n: int, duplicate: bool) -> bytes:
+    if duplicate:
+        return payload
+    # A 16-byte run id plus the request number changes the content digest without regenerating the body.
+    return run_id + n.to_bytes(8, "big") + payload[NONCE_SIZE:]
+
+
+def upload(url: str, body: bytes, n: int) -> float:
+    started = time.perf_counter()
+    response = requests.post(f"{url}/ingest", files={"file": (f"loadtest-{n}.bin", body)}, timeout=120)
+    response.raise_for_status()
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8001")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--size", type=int, default=256 * 1024, help="payload bytes per upload")
+    parser.add_argument(
+        "--duplicate", action="store_true", help="send the same body every time (measures dedup hits, not writes)"
+    )
+    args = parser.parse_args()
+
+    payload = os.urandom(max(args.size, NONCE_SIZE))
+    run_id = os.urandom(16)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        latencies = sorted(
+            pool.map(lambda n: upload(args.url, body_for(payload, run_id, n, args.duplicate), n), range(args.requests))
+        )
+    elapsed = time.perf_counter() - started
+
+    mode = "identical (dedup hits)" if args.duplicate else "unique"
+    print(f"{args.requests} {mode} uploads of {len(payload)} bytes, concurrency {args.concurrency}")
+    print(f"requests/sec: {args.requests / elapsed:.1f}")
+    print(f"MiB/sec:      {args.requests * len(payload) / elapsed / (1024 * 1024):.1f}")
+    print(f"p50 latency:  {statistics.median(latencies) * 1000:.1f} ms")
+    print(f"p95 latency:  {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,77 @@
+import asyncio
+import functools
+import hashlib
+import hmac
 import json
 import logging
+import math
 import os
-from typing import Optional
+import shutil
+import sqlite3
+import tarfile
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from urllib.parse import quote, unquote
+from typing import Dict, List, Optional
 
 import boto3
 from cryptography.fernet import Fernet
-from fastapi import FastAPI, File, HTTPException, UploadFile
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from fastapi import FastAPI, File, Header, HTTPException, Request, Response, UploadFile
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from kafka import KafkaProducer
 from pydantic import BaseModel, Field
 
+from shared.outbox import Outbox, OutboxEntry
+from shared.segmented import (
+    DEFAULT_SEGMENT_SIZE,
+    SegmentReader,
+    SegmentWriter,
+    SegmentedBlobError,
+    derive_key,
+    is_segmented,
+    iter_legacy,
+)
+
 app = FastAPI(title="Data Capture Service")
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
 logger = logging.getLogger("data-capture")
 
+DATA_TOPIC = os.getenv("REDPANDA_TOPIC_DATA", "data_topic")
+# Sends are batched by the producer (linger/batch size) and confirmed through future callbacks.
 producer = KafkaProducer(
     bootstrap_servers=os.getenv("REDPANDA_BROKERS", "redpanda:9092"),
-    value_serializer=lambda v: json.dumps(v).encode('utf-8')
+    value_serializer=lambda v: json.dumps(v).encode('utf-8'),
+    linger_ms=int(os.getenv("KAFKA_LINGER_MS", "20")),
+    batch_size=int(os.getenv("KAFKA_BATCH_SIZE", str(64 * 1024))),
+    retries=int(os.getenv("KAFKA_RETRIES", "5")),
+    # Fail fast into the outbox instead of holding a request while broker metadata is unavailable.
+    max_block_ms=int(os.getenv("KAFKA_MAX_BLOCK_MS", "5000")),
+)
+PUBLISH_LOCK = threading.Lock()
+PUBLISH_STATS = {"in_flight": 0, "delivered": 0, "failed": 0, "outboxed": 0}
+
+# Local write-ahead outbox: uploads and messages land here when MinIO or Redpanda is unavailable.
+outbox = Outbox(
+    os.getenv("OUTBOX_DIR", "/data/outbox"),
+    base_backoff=float(os.getenv("OUTBOX_BASE_BACKOFF_SECONDS", "1")),
+    max_backoff=float(os.getenv("OUTBOX_MAX_BACKOFF_SECONDS", "300")),
 )
+OUTBOX_DRAIN_INTERVAL = float(os.getenv("OUTBOX_DRAIN_INTERVAL_SECONDS", "2"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_STATS = {"replayed": 0}
+# Cleared on a storage failure so new uploads go straight to the outbox until the drainer gets through.
+STORAGE_HEALTHY = threading.Event()
+STORAGE_HEALTHY.set()
+DRAIN_STOP_EVENT = threading.Event()
+DRAIN_THREAD: Optional[threading.Thread] = None
 
 s3 = boto3.client(
     's3',
@@ -25,8 +79,135 @@ s3 = boto3.client(
     aws_access_key_id=os.getenv('MINIO_ACCESS_KEY'),
     aws_secret_access_key=os.getenv('MINIO_SECRET_KEY')
 )
+# Presigned URLs must carry the host clients reach MinIO on, which may differ from the in-cluster endpoint.
+presign_s3 = boto3.client(
+    's3',
+    endpoint_url=f"http://{os.getenv('MINIO_PUBLIC_ENDPOINT') or os.getenv('MINIO_ENDPOINT', 'minio:9000')}",
+    aws_access_key_id=os.getenv('MINIO_ACCESS_KEY'),
+    aws_secret_access_key=os.getenv('MINIO_SECRET_KEY')
+)
 
 bucket_name = os.getenv("MINIO_BUCKET", "kindpath-data")
+# Encrypted bytes buffered per multipart part; S3 requires every part but the last to be >= 5 MiB.
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", str(8 * 1024 * 1024)))
+BLOB_SEGMENT_SIZE = int(os.getenv("BLOB_SEGMENT_SIZE", str(DEFAULT_SEGMENT_SIZE)))
+# boto3 and the Kafka client are synchronous; their calls run on this bounded pool instead of the event loop.
+STORAGE_CONCURRENCY = int(os.getenv("STORAGE_CONCURRENCY", "16"))
+# Uploads allowed in the storage stage at once; each holds up to INGEST_CHUNK_SIZE of ciphertext.
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "32"))
+PRESIGNED_PREFIX = "incoming/"
+PRESIGNED_PART_SIZE = int(os.getenv("PRESIGNED_PART_SIZE", str(64 * 1024 * 1024)))
+PRESIGNED_URL_TTL = int(os.getenv("PRESIGNED_URL_TTL_SECONDS", "900"))
+# Direct uploads bypass our segment encryption, so they are only offered when MinIO encrypts them at
+# rest: "AES256" needs a MinIO KMS key (MINIO_KMS_SECRET_KEY). Unset, /uploads/presigned answers 503.
+PRESIGNED_SSE = os.getenv("PRESIGNED_SSE", "")
+# Files from one /ingest/batch request stored at once; archive members spill to disk past the spool size.
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "1000"))
+BATCH_MEMBER_SPOOL_SIZE = int(os.getenv("BATCH_MEMBER_SPOOL_SIZE", str(1024 * 1024)))
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PIPELINE_STAGES = ("read", "digest", "encrypt", "store", "outbox", "publish")
+
+class Histogram:
+    def __init__(self, buckets=STAGE_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self) -> Dict[str, object]:
+        cumulative, running = {}, 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            running += count
+            cumulative[str(bound)] = running
+        return {"buckets": cumulative, "sum": self.sum, "count": self.count}
+
+class PipelineMetrics:
+    """Per-stage latency histograms, byte counters, error counters and the in-flight gauge for ingest."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stages = {stage: Histogram() for stage in PIPELINE_STAGES}
+        self.errors = {stage: 0 for stage in PIPELINE_STAGES}
+        self.bytes = {"received": 0, "stored": 0, "outboxed": 0}
+        self.in_flight = 0
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self.lock:
+            self.stages[stage].observe(seconds)
+
+    def error(self, stage: str) -> None:
+        with self.lock:
+            self.errors[stage] += 1
+
+    def add_bytes(self, kind: str, count: int) -> None:
+        with self.lock:
+            self.bytes[kind] += count
+
+    def track_in_flight(self, delta: int) -> None:
+        with self.lock:
+            self.in_flight += delta
+
+    def snapshot(self) -> Dict[str, object]:
+        with self.lock:
+            return {
+                "stages": {stage: hist.snapshot() for stage, hist in self.stages.items()},
+                "errors": dict(self.errors),
+                "bytes": dict(self.bytes),
+                "in_flight": self.in_flight,
+            }
+
+    def prometheus(self) -> str:
+        snap = self.snapshot()
+        lines = ["# TYPE data_capture_stage_seconds histogram"]
+        for stage, hist in snap["stages"].items():
+            for bound, count in hist["buckets"].items():
+                lines.append(f'data_capture_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+            lines.append(f'data_capture_stage_seconds_sum{{stage="{stage}"}} {hist["sum"]}')
+            lines.append(f'data_capture_stage_seconds_count{{stage="{stage}"}} {hist["count"]}')
+        lines.append("# TYPE data_capture_stage_errors_total counter")
+        lines += [f'data_capture_stage_errors_total{{stage="{k}"}} {v}' for k, v in snap["errors"].items()]
+        lines.append("# TYPE data_capture_bytes_total counter")
+        lines += [f'data_capture_bytes_total{{kind="{k}"}} {v}' for k, v in snap["bytes"].items()]
+        lines.append("# TYPE data_capture_uploads_in_flight gauge")
+        lines.append(f"data_capture_uploads_in_flight {snap['in_flight']}")
+        return "\n".join(lines) + "\n"
+
+pipeline_metrics = PipelineMetrics()
+
+class StageTimer:
+    """Accumulates one upload's time per stage; totals are observed once the upload finishes."""
+
+    def __init__(self):
+        self.totals: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            pipeline_metrics.error(name)
+            raise
+        finally:
+            self.totals[name] = self.totals.get(name, 0.0) + time.perf_counter() - started
+
+    def observe(self) -> None:
+        for name, seconds in self.totals.items():
+            pipeline_metrics.observe(name, seconds)
+
+storage_executor = ThreadPoolExecutor(max_workers=STORAGE_CONCURRENCY, thread_name_prefix="storage")
+ingest_slots = asyncio.Semaphore(INGEST_CONCURRENCY)
 
 def load_cipher() -> Fernet:
     key = os.getenv("ENCRYPTION_KEY")
@@ -35,33 +216,836 @@ def load_cipher() -> Fernet:
     return Fernet(key.encode())
 
 cipher = load_cipher()
+# Objects are written in the segmented format (shared/segmented.py); the Fernet cipher reads legacy objects.
+blob_key = derive_key(os.environ["ENCRYPTION_KEY"])
+# Objects are addressed by a keyed digest of their plaintext so bucket listings don't reveal file hashes.
+digest_key = HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=b"kindpath-content-address").derive(blob_key)
+
+class Manifest:
+    """Append-only filename -> digest history kept next to the outbox."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS manifest (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                filename TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_manifest_filename ON manifest (filename);
+            CREATE INDEX IF NOT EXISTS idx_manifest_digest ON manifest (digest);
+            """
+        )
+        self._conn.commit()
+
+    def record(self, filename: str, digest: str, size: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO manifest (filename, digest, size, created_at) VALUES (?, ?, ?, ?)",
+                (filename, digest, size, time.time()),
+            )
+            self._conn.commit()
+
+    def has_digest(self, digest: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM manifest WHERE digest = ? LIMIT 1", (digest,)).fetchone() is not None
+
+    def history(self, filename: str) -> List[Dict[str, object]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT digest, size, created_at FROM manifest WHERE filename = ? ORDER BY id DESC", (filename,)
+            ).fetchall()
+        return [{"digest": r[0], "size": r[1], "recorded_at": r[2]} for r in rows]
+
+manifest = Manifest(os.getenv("MANIFEST_PATH", "/data/manifest.sqlite3"))
+DEDUP_LOCK = threading.Lock()
+DEDUP_STATS = {"uploads": 0, "hits": 0, "bytes_skipped": 0}
+
+class UploadSessions:
+    """Resumable upload sessions: S3 multipart state plus a resumable segment writer per session."""
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(directory, "sessions.sqlite3"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS upload_sessions (
+                id TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                metadata TEXT NOT NULL,
+                object_key TEXT NOT NULL,
+                s3_upload_id TEXT NOT NULL,
+                writer_state TEXT NOT NULL,
+                parts TEXT NOT NULL,
+                spool_size INTEGER NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_upload_sessions_expiry ON upload_sessions (expires_at);
+            """
+        )
+        self._conn.commit()
+
+    def spool_path(self, session_id: str) -> str:
+        return os.path.join(self.directory, f"{session_id}.spool")
+
+    def create(self, session: Dict[str, object]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO upload_sessions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    session["id"],
+                    session["filename"],
+                    session["metadata"],
+                    session["object_key"],
+                    session["s3_upload_id"],
+                    json.dumps(session["writer_state"]),
+                    json.dumps(session["parts"]),
+                    session["spool_size"],
+                    session["expires_at"],
+                ),
+            )
+            self._conn.commit()
+
+    def get(self, session_id: str) -> Optional[Dict[str, object]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, filename, metadata, object_key, s3_upload_id, writer_state, parts, spool_size, expires_at "
+                "FROM upload_sessions WHERE id = ? AND expires_at > ?",
+                (session_id, time.time()),
+            ).fetchone()
+        if not row:
+            return None
+        return {
+            "id": row[0],
+            "filename": row[1],
+            "metadata": row[2],
+            "object_key": row[3],
+            "s3_upload_id": row[4],
+            "writer_state": json.loads(row[5]),
+            "parts": json.loads(row[6]),
+            "spool_size": row[7],
+            "expires_at": row[8],
+        }
+
+    def checkpoint(self, session_id: str, writer_state: dict, parts: list, spool_size: int, expires_at: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE upload_sessions SET writer_state = ?, parts = ?, spool_size = ?, expires_at = ? WHERE id = ?",
+                (json.dumps(writer_state), json.dumps(parts), spool_size, expires_at, session_id),
+            )
+            self._conn.commit()
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM upload_sessions WHERE id = ?", (session_id,))
+            self._conn.commit()
+        if os.path.exists(self.spool_path(session_id)):
+            os.remove(self.spool_path(session_id))
+
+    def expired(self) -> List[Dict[str, object]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, object_key, s3_upload_id FROM upload_sessions WHERE expires_at <= ?", (time.time(),)
+            ).fetchall()
+        return [{"id": r[0], "object_key": r[1], "s3_upload_id": r[2]} for r in rows]
+
+UPLOAD_SESSION_TTL = float(os.getenv("UPLOAD_SESSION_TTL_SECONDS", str(24 * 3600)))
+upload_sessions = UploadSessions(os.getenv("UPLOAD_SESSION_DIR", "/data/uploads"))
+SESSION_LOCKS: Dict[str, asyncio.Lock] = {}
 
 class IngestResponse(BaseModel):
     status: str
     file: str
     metadata: Optional[str] = Field(default=None, description="Metadata payload passed through")
+    size: Optional[int] = Field(default=None, description="Plaintext bytes stored")
+    throughput_bytes_per_sec: Optional[float] = Field(default=None, description="Read + encrypt + store rate")
+    digest: Optional[str] = Field(default=None, description="Content address of the stored object")
+    deduplicated: bool = False
+    detail: Optional[str] = Field(default=None, description="Error detail when status is 'error'")
+
+class BatchIngestResponse(BaseModel):
+    files: List[IngestResponse]
+    stored: int
+    errors: int
+
+class UploadSessionCreate(BaseModel):
+    filename: str = Field(..., min_length=1)
+    metadata: str = ""
+
+class PresignedUploadRequest(BaseModel):
+    filename: str = Field(..., min_length=1)
+    size: int = Field(..., gt=0, description="Total bytes the client will upload")
+    metadata: str = ""
+
+class PresignedPart(BaseModel):
+    part_number: int
+    etag: str
+
+class PresignedCompleteRequest(BaseModel):
+    key: str
+    parts: List[PresignedPart]
+
+def _upload_part(key: str, upload_id: str, part_number: int, body: bytes) -> dict:
+    part = s3.upload_part(Bucket=bucket_name, Key=key, UploadId=upload_id, PartNumber=part_number, Body=body)
+    return {"ETag": part["ETag"], "PartNumber": part_number}
+
+async def offload(fn, *args, **kwargs):
+    """Run a blocking client call on the storage pool so the event loop keeps serving other uploads."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(storage_executor, functools.partial(fn, *args, **kwargs))
+
+async def _stream_to_bucket(file: UploadFile, key: str, timer: StageTimer) -> int:
+    """Encrypt the upload segment by segment and push it through a multipart upload so memory stays flat."""
+    writer = SegmentWriter(blob_key, BLOB_SEGMENT_SIZE)
+    buffer = bytearray(writer.header())
+    upload_id = None
+    parts = []
+    stored = 0
+    try:
+        while True:
+            with timer.stage("read"):
+                chunk = await file.read(BLOB_SEGMENT_SIZE)
+            if not chunk:
+                break
+            with timer.stage("encrypt"):
+                buffer += await offload(writer.seal, chunk)
+            if len(buffer) >= INGEST_CHUNK_SIZE:
+                with timer.stage("store"):
+                    if upload_id is None:
+                        upload_id = (await offload(s3.create_multipart_upload, Bucket=bucket_name, Key=key))["UploadId"]
+                    parts.append(await offload(_upload_part, key, upload_id, len(parts) + 1, bytes(buffer)))
+                stored += len(buffer)
+                buffer.clear()
+        buffer += writer.finish()
+        with timer.stage("store"):
+            if upload_id is None:
+                await offload(s3.put_object, Bucket=bucket_name, Key=key, Body=bytes(buffer))
+            else:
+                parts.append(await offload(_upload_part, key, upload_id, len(parts) + 1, bytes(buffer)))
+                await offload(
+                    s3.complete_multipart_upload,
+                    Bucket=bucket_name,
+                    Key=key,
+                    UploadId=upload_id,
+                    MultipartUpload={"Parts": parts},
+                )
+        pipeline_metrics.add_bytes("stored", stored + len(buffer))
+    except Exception:
+        if upload_id is not None:
+            try:
+                await offload(s3.abort_multipart_upload, Bucket=bucket_name, Key=key, UploadId=upload_id)
+            except Exception:
+                logger.exception("Failed to abort multipart upload %s for %s", upload_id, key)
+        raise
+    return writer.plaintext_size
+
+def _on_delivered(sent_at: float, _record_metadata) -> None:
+    pipeline_metrics.observe("publish", time.perf_counter() - sent_at)
+    with PUBLISH_LOCK:
+        PUBLISH_STATS["in_flight"] -= 1
+        PUBLISH_STATS["delivered"] += 1
+
+def _on_failed(message: Dict[str, object], exc: BaseException) -> None:
+    pipeline_metrics.error("publish")
+    with PUBLISH_LOCK:
+        PUBLISH_STATS["in_flight"] -= 1
+        PUBLISH_STATS["failed"] += 1
+    try:
+        outbox.enqueue("publish", {"object_key": None, "message": message})
+    except Exception:
+        logger.exception("Failed to write ingest message for %s to the outbox", message.get("filename"))
+        return
+    with PUBLISH_LOCK:
+        PUBLISH_STATS["outboxed"] += 1
+    logger.warning("Failed to publish ingest message for %s; queued in outbox: %s", message.get("filename"), exc)
+
+def publish(message: Dict[str, object]) -> None:
+    """Hand a message to the batching producer without waiting for the broker."""
+    with PUBLISH_LOCK:
+        PUBLISH_STATS["in_flight"] += 1
+    sent_at = time.perf_counter()
+    try:
+        future = producer.send(DATA_TOPIC, message)
+    except Exception as exc:
+        _on_failed(message, exc)
+        return
+    # The publish stage is measured from send() to broker acknowledgement.
+    future.add_callback(functools.partial(_on_delivered, sent_at))
+    future.add_errback(lambda exc: _on_failed(message, exc))
+
+async def _spool_to_outbox(file: UploadFile, key: str, message: Dict[str, object], timer: StageTimer) -> int:
+    """Encrypt the upload to a local outbox file and queue it with its message for the drainer."""
+    await file.seek(0)
+    path = outbox.payload_path(f"{uuid.uuid4().hex}.blob")
+    writer = SegmentWriter(blob_key, BLOB_SEGMENT_SIZE)
+    with timer.stage("outbox"), open(path, "wb") as spool:
+        await offload(spool.write, writer.header())
+        while True:
+            chunk = await file.read(BLOB_SEGMENT_SIZE)
+            if not chunk:
+                break
+            await offload(spool.write, await offload(writer.seal, chunk))
+        await offload(spool.write, writer.finish())
+        await offload(os.fsync, spool.fileno())
+        size = spool.tell()
+        await offload(
+            outbox.enqueue, "ingest", {"object_key": key, "size": writer.plaintext_size, "message": message}, path
+        )
+    pipeline_metrics.add_bytes("outboxed", size)
+    return writer.plaintext_size
+
+async def _digest_upload(file: UploadFile, timer: StageTimer):
+    """Keyed SHA-256 over the spooled upload; a cheap local read that lets duplicates skip encrypt + PUT."""
+    mac = hmac.new(digest_key, digestmod=hashlib.sha256)
+    size = 0
+    await file.seek(0)
+    while True:
+        with timer.stage("read"):
+            chunk = await file.read(BLOB_SEGMENT_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        with timer.stage("digest"):
+            await offload(mac.update, chunk)
+    await file.seek(0)
+    pipeline_metrics.add_bytes("received", size)
+    return mac.hexdigest(), size
+
+def _object_exists(digest: str, key: str) -> bool:
+    if manifest.has_digest(digest):
+        return True
+    try:
+        s3.head_object(Bucket=bucket_name, Key=key)
+        return True
+    except Exception:
+        return False
+
+def _replay_batch(entries: List[OutboxEntry]) -> int:
+    ready = []
+    for entry in entries:
+        if entry.payload_path:
+            if not STORAGE_HEALTHY.is_set() and ready:
+                # Storage just failed in this batch; leave remaining payloads for the next round.
+                continue
+            try:
+                s3.upload_file(entry.payload_path, bucket_name, entry.message["object_key"])
+            except Exception as exc:
+                logger.warning("Outbox replay to bucket %s failed: %s", bucket_name, exc)
+                STORAGE_HEALTHY.clear()
+                outbox.retry(entry)
+                continue
+            STORAGE_HEALTHY.set()
+            outbox.payload_delivered(entry)
+            message = entry.message["message"]
+            manifest.record(message["filename"], message["digest"], entry.message["size"])
+        ready.append(entry)
+    sent = []
+    for entry in ready:
+        try:
+            sent.append((entry, producer.send(DATA_TOPIC, entry.message["message"])))
+        except Exception as exc:
+            logger.warning("Outbox replay to topic %s failed: %s", DATA_TOPIC, exc)
+            outbox.retry(entry)
+    if not sent:
+        return 0
+    try:
+        producer.flush(timeout=30)
+    except Exception:
+        logger.exception("Flush failed during outbox replay")
+    replayed = 0
+    for entry, future in sent:
+        if future.succeeded():
+            outbox.ack(entry)
+            replayed += 1
+        else:
+            outbox.retry(entry)
+    return replayed
+
+def drain_outbox_once() -> int:
+    entries = outbox.due(OUTBOX_BATCH_SIZE)
+    if not entries and not STORAGE_HEALTHY.is_set():
+        try:
+            s3.head_bucket(Bucket=bucket_name)
+            STORAGE_HEALTHY.set()
+        except Exception:
+            pass
+    replayed = _replay_batch(entries) if entries else 0
+    with PUBLISH_LOCK:
+        OUTBOX_STATS["replayed"] += replayed
+    return replayed
+
+def gc_upload_sessions() -> int:
+    expired = upload_sessions.expired()
+    for session in expired:
+        try:
+            s3.abort_multipart_upload(Bucket=bucket_name, Key=session["object_key"], UploadId=session["s3_upload_id"])
+        except Exception:
+            logger.warning("Failed to abort multipart upload for expired session %s", session["id"])
+        upload_sessions.delete(session["id"])
+        SESSION_LOCKS.pop(session["id"], None)
+    if expired:
+        logger.info("Garbage-collected %d expired upload sessions", len(expired))
+    return len(expired)
+
+def drain_outbox(stop_event: threading.Event) -> None:
+    while not stop_event.wait(OUTBOX_DRAIN_INTERVAL):
+        try:
+            while drain_outbox_once() >= OUTBOX_BATCH_SIZE and not stop_event.is_set():
+                pass
+            gc_upload_sessions()
+        except Exception:
+            logger.exception("Outbox drain failed")
+
+async def _store_upload(file: UploadFile, metadata: str, messages: List[Dict[str, object]]) -> IngestResponse:
+    """Digest, dedup and store one upload; the ingest message is appended to `messages` for the caller to publish."""
+    timer = StageTimer()
+    pipeline_metrics.track_in_flight(1)
+    try:
+        return await _store_timed_upload(file, metadata, messages, timer)
+    finally:
+        pipeline_metrics.track_in_flight(-1)
+        timer.observe()
+
+async def _store_timed_upload(
+    file: UploadFile, metadata: str, messages: List[Dict[str, object]], timer: StageTimer
+) -> IngestResponse:
+    started = time.perf_counter()
+    digest, plaintext_size = await _digest_upload(file, timer)
+    key = f"objects/{digest}"
+    message = {"filename": file.filename, "metadata": metadata, "digest": digest, "object_key": key}
+    duplicate = await offload(_object_exists, digest, key)
+    with DEDUP_LOCK:
+        DEDUP_STATS["uploads"] += 1
+        if duplicate:
+            DEDUP_STATS["hits"] += 1
+            DEDUP_STATS["bytes_skipped"] += plaintext_size
+    if duplicate:
+        await offload(manifest.record, file.filename, digest, plaintext_size)
+        messages.append(message)
+        return IngestResponse(
+            status="deduplicated",
+            file=file.filename,
+            metadata=metadata,
+            size=plaintext_size,
+            digest=digest,
+            deduplicated=True,
+        )
+    size = None
+    if STORAGE_HEALTHY.is_set():
+        try:
+            async with ingest_slots:
+                size = await _stream_to_bucket(file, key, timer)
+        except Exception:
+            logger.exception("Failed to write to bucket %s; falling back to the outbox", bucket_name)
+            STORAGE_HEALTHY.clear()
+    if size is None:
+        try:
+            size = await _spool_to_outbox(file, key, message, timer)
+        except Exception:
+            logger.exception("Failed to write %s to the outbox", file.filename)
+            raise HTTPException(status_code=500, detail="Failed to store encrypted file")
+        return IngestResponse(status="queued", file=file.filename, metadata=metadata, size=size, digest=digest)
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    throughput = size / elapsed
+    logger.info("Stored %s: %d bytes in %.3fs (%.1f MiB/s)", file.filename, size, elapsed, throughput / (1024 * 1024))
+    await offload(manifest.record, file.filename, digest, size)
+    messages.append(message)
+    return IngestResponse(
+        status="ingested",
+        file=file.filename,
+        metadata=metadata,
+        size=size,
+        throughput_bytes_per_sec=throughput,
+        digest=digest,
+    )
+
+def _publish_all(messages: List[Dict[str, object]]) -> None:
+    for message in messages:
+        publish(message)
 
 @app.post("/ingest")
-async def ingest_data(file: UploadFile = File(...), metadata: str = ""):
-    encrypted_data = cipher.encrypt(await file.read())
+async def ingest_data(response: Response, file: UploadFile = File(...), metadata: str = ""):
+    messages: List[Dict[str, object]] = []
+    result = await _store_upload(file, metadata, messages)
+    if result.status == "queued":
+        response.status_code = 202
+    await offload(_publish_all, messages)
+    return result
+
+def _spool_member(name: str, source) -> UploadFile:
+    spool = tempfile.SpooledTemporaryFile(max_size=BATCH_MEMBER_SPOOL_SIZE)
+    shutil.copyfileobj(source, spool)
+    spool.seek(0)
+    return UploadFile(file=spool, filename=name)
+
+def _unpack_archive(archive: UploadFile) -> List[UploadFile]:
+    """Split a tar (any compression) or zip upload into spooled members, in archive order."""
+    archive.file.seek(0)
+    members = []
+    if (archive.filename or "").lower().endswith(".zip"):
+        with zipfile.ZipFile(archive.file) as bundle:
+            for info in bundle.infolist():
+                if info.is_dir():
+                    continue
+                if len(members) > BATCH_MAX_FILES:
+                    break
+                with bundle.open(info) as source:
+                    members.append(_spool_member(info.filename, source))
+    else:
+        with tarfile.open(fileobj=archive.file, mode="r|*") as bundle:
+            for member in bundle:
+                if not member.isfile():
+                    continue
+                if len(members) > BATCH_MAX_FILES:
+                    break
+                members.append(_spool_member(member.name, bundle.extractfile(member)))
+    return members
+
+@app.post("/ingest/batch", response_model=BatchIngestResponse)
+async def ingest_batch(
+    files: List[UploadFile] = File(default=[]),
+    archive: Optional[UploadFile] = File(default=None),
+    metadata: str = "",
+):
+    """Store many files (or a tar/zip of them) concurrently and publish their messages together."""
+    uploads = list(files)
+    unpacked: List[UploadFile] = []
+    if archive is not None:
+        try:
+            unpacked = await offload(_unpack_archive, archive)
+        except (tarfile.TarError, zipfile.BadZipFile):
+            raise HTTPException(status_code=422, detail="Archive must be a tar or zip file")
+    uploads += unpacked
+    if not uploads:
+        raise HTTPException(status_code=422, detail="No files provided")
+    if len(uploads) > BATCH_MAX_FILES:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_FILES} files per batch")
+    slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+    messages: List[Dict[str, object]] = []
+
+    async def store(upload: UploadFile) -> IngestResponse:
+        async with slots:
+            try:
+                return await _store_upload(upload, metadata, messages)
+            except HTTPException as exc:
+                return IngestResponse(status="error", file=upload.filename, metadata=metadata, detail=exc.detail)
+            except Exception:
+                logger.exception("Failed to ingest %s in batch", upload.filename)
+                return IngestResponse(status="error", file=upload.filename, metadata=metadata, detail="Failed to ingest")
+
+    try:
+        results = await asyncio.gather(*(store(upload) for upload in uploads))
+    finally:
+        for upload in unpacked:
+            await upload.close()
+    await offload(_publish_all, messages)
+    errors = sum(1 for r in results if r.status == "error")
+    return BatchIngestResponse(files=results, stored=len(results) - errors, errors=errors)
+
+def _session_or_404(session_id: str) -> Dict[str, object]:
+    session = upload_sessions.get(session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found or expired")
+    return session
+
+@asynccontextmanager
+async def _locked_session(session_id: str):
+    """Hold a session's lock and yield the session; unknown ids 404 without leaving a lock behind."""
+    await offload(_session_or_404, session_id)
+    async with SESSION_LOCKS.setdefault(session_id, asyncio.Lock()):
+        try:
+            session = await offload(_session_or_404, session_id)
+        except HTTPException:
+            SESSION_LOCKS.pop(session_id, None)  # finalized or collected while we waited
+            raise
+        yield session
+
+async def _flush_session_part(session: Dict[str, object], spool, writer: SegmentWriter, parts: list) -> None:
+    """Ship the spooled ciphertext as the next part and checkpoint, so a crash resumes from here."""
+    await offload(spool.seek, 0)
+    body = await offload(spool.read)
+    parts.append(await offload(_upload_part, session["object_key"], session["s3_upload_id"], len(parts) + 1, body))
+    await offload(spool.seek, 0)
+    await offload(spool.truncate, 0)
+    await offload(
+        upload_sessions.checkpoint, session["id"], writer.state(), parts, 0, time.time() + UPLOAD_SESSION_TTL
+    )
+
+@app.post("/uploads")
+async def create_upload_session(request: UploadSessionCreate):
+    """Open a resumable upload; PUT chunks at Upload-Offset, query the offset, then finalize."""
+    session_id = uuid.uuid4().hex
+    key = f"uploads/{session_id}"
     try:
-        s3.put_object(Bucket=bucket_name, Key=file.filename, Body=encrypted_data)
+        upload_id = (await offload(s3.create_multipart_upload, Bucket=bucket_name, Key=key))["UploadId"]
     except Exception:
-        logger.exception("Failed to write to bucket %s", bucket_name)
-        raise HTTPException(status_code=500, detail="Failed to store encrypted file")
-    message = {"filename": file.filename, "metadata": metadata}
+        logger.exception("Failed to start multipart upload for session %s", session_id)
+        raise HTTPException(status_code=500, detail="Failed to create upload session")
+    writer = SegmentWriter(blob_key, BLOB_SEGMENT_SIZE)
+    with open(upload_sessions.spool_path(session_id), "wb") as spool:
+        spool.write(writer.header())
+    expires_at = time.time() + UPLOAD_SESSION_TTL
+    await offload(
+        upload_sessions.create,
+        {
+            "id": session_id,
+            "filename": request.filename,
+            "metadata": request.metadata,
+            "object_key": key,
+            "s3_upload_id": upload_id,
+            "writer_state": writer.state(),
+            "parts": [],
+            "spool_size": len(writer.header()),
+            "expires_at": expires_at,
+        },
+    )
+    return {"id": session_id, "offset": 0, "chunk_multiple": BLOB_SEGMENT_SIZE, "expires_at": expires_at}
+
+@app.api_route("/uploads/{session_id}", methods=["GET", "HEAD"])
+def get_upload_session(session_id: str, response: Response):
+    session = _session_or_404(session_id)
+    offset = session["writer_state"]["plaintext_size"]
+    response.headers["Upload-Offset"] = str(offset)
+    return {"id": session_id, "filename": session["filename"], "offset": offset, "expires_at": session["expires_at"]}
+
+@app.put("/uploads/{session_id}")
+async def upload_chunk(session_id: str, request: Request, upload_offset: int = Header(..., alias="Upload-Offset")):
+    """Append a chunk at the current offset. Chunks must be multiples of chunk_multiple except the last."""
+    async with _locked_session(session_id) as session:
+        writer = SegmentWriter.from_state(blob_key, session["writer_state"])
+        if upload_offset != writer.plaintext_size:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Upload is at offset {writer.plaintext_size}",
+                headers={"Upload-Offset": str(writer.plaintext_size)},
+            )
+        parts = session["parts"]
+        pending = bytearray()
+        try:
+            with open(upload_sessions.spool_path(session_id), "r+b") as spool:
+                # Drop anything a failed earlier request appended after the last checkpoint.
+                await offload(spool.truncate, session["spool_size"])
+                await offload(spool.seek, session["spool_size"])
+                async for piece in request.stream():
+                    pending += piece
+                    while len(pending) >= BLOB_SEGMENT_SIZE:
+                        await offload(spool.write, await offload(writer.seal, bytes(pending[:BLOB_SEGMENT_SIZE])))
+                        del pending[:BLOB_SEGMENT_SIZE]
+                        if spool.tell() >= INGEST_CHUNK_SIZE:
+                            await _flush_session_part(session, spool, writer, parts)
+                if pending:
+                    await offload(spool.write, await offload(writer.seal, bytes(pending)))
+                spool_size = spool.tell()
+        except SegmentedBlobError:
+            raise HTTPException(status_code=409, detail="Upload already ended with a short chunk; finalize it")
+        except Exception:
+            logger.exception("Failed to store chunk for upload session %s", session_id)
+            raise HTTPException(status_code=500, detail="Failed to store chunk")
+        await offload(
+            upload_sessions.checkpoint, session_id, writer.state(), parts, spool_size, time.time() + UPLOAD_SESSION_TTL
+        )
+    return Response(status_code=204, headers={"Upload-Offset": str(writer.plaintext_size)})
+
+@app.post("/uploads/{session_id}/finalize")
+async def finalize_upload(session_id: str):
+    async with _locked_session(session_id) as session:
+        writer = SegmentWriter.from_state(blob_key, session["writer_state"])
+        parts = session["parts"]
+        try:
+            with open(upload_sessions.spool_path(session_id), "r+b") as spool:
+                await offload(spool.truncate, session["spool_size"])
+                await offload(spool.seek, session["spool_size"])
+                await offload(spool.write, writer.finish())
+                await offload(spool.seek, 0)
+                body = await offload(spool.read)
+            parts.append(await offload(_upload_part, session["object_key"], session["s3_upload_id"], len(parts) + 1, body))
+            await offload(
+                s3.complete_multipart_upload,
+                Bucket=bucket_name,
+                Key=session["object_key"],
+                UploadId=session["s3_upload_id"],
+                MultipartUpload={"Parts": parts},
+            )
+        except Exception:
+            logger.exception("Failed to finalize upload session %s", session_id)
+            raise HTTPException(status_code=500, detail="Failed to finalize upload")
+        await offload(upload_sessions.delete, session_id)
+    SESSION_LOCKS.pop(session_id, None)
+    message = {"filename": session["filename"], "metadata": session["metadata"], "object_key": session["object_key"]}
+    await offload(publish, message)
+    return IngestResponse(
+        status="ingested", file=session["filename"], metadata=session["metadata"], size=writer.plaintext_size
+    )
+
+@app.delete("/uploads/{session_id}")
+async def abort_upload_session(session_id: str):
+    session = await offload(_session_or_404, session_id)
+    try:
+        await offload(
+            s3.abort_multipart_upload, Bucket=bucket_name, Key=session["object_key"], UploadId=session["s3_upload_id"]
+        )
+    except Exception:
+        logger.warning("Failed to abort multipart upload for session %s", session_id)
+    await offload(upload_sessions.delete, session_id)
+    SESSION_LOCKS.pop(session_id, None)
+    return {"status": "aborted"}
+
+@app.post("/uploads/presigned")
+def create_presigned_upload(request: PresignedUploadRequest):
+    """Start a multipart upload the client sends straight to MinIO; this service only sees metadata."""
+    if not PRESIGNED_SSE:
+        raise HTTPException(status_code=503, detail="Direct uploads need PRESIGNED_SSE (MinIO server-side encryption)")
+    part_count = math.ceil(request.size / PRESIGNED_PART_SIZE)
+    if part_count > 10000:
+        raise HTTPException(status_code=422, detail="File too large for the configured part size")
+    key = f"{PRESIGNED_PREFIX}{uuid.uuid4().hex}/{request.filename}"
+    params = {
+        "Bucket": bucket_name,
+        "Key": key,
+        "Metadata": {"filename": quote(request.filename), "ingest-metadata": quote(request.metadata)},
+        "ServerSideEncryption": PRESIGNED_SSE,
+    }
     try:
-        producer.send(os.getenv("REDPANDA_TOPIC_DATA", "data_topic"), message)
-        producer.flush()
+        upload_id = s3.create_multipart_upload(**params)["UploadId"]
+        urls = [
+            presign_s3.generate_presigned_url(
+                "upload_part",
+                Params={"Bucket": bucket_name, "Key": key, "UploadId": upload_id, "PartNumber": n},
+                ExpiresIn=PRESIGNED_URL_TTL,
+            )
+            for n in range(1, part_count + 1)
+        ]
     except Exception:
-        logger.exception("Failed to publish ingest message")
-        raise HTTPException(status_code=500, detail="Failed to publish ingest message")
-    return IngestResponse(status="ingested", file=file.filename, metadata=metadata)
+        logger.exception("Failed to create presigned upload for %s", request.filename)
+        raise HTTPException(status_code=500, detail="Failed to create presigned upload")
+    return {
+        "upload_id": upload_id,
+        "key": key,
+        "part_size": PRESIGNED_PART_SIZE,
+        "expires_in": PRESIGNED_URL_TTL,
+        "encryption": PRESIGNED_SSE,
+        "parts": [{"part_number": n, "url": url} for n, url in enumerate(urls, start=1)],
+    }
+
+@app.post("/uploads/presigned/{upload_id}/complete")
+def complete_presigned_upload(upload_id: str, request: PresignedCompleteRequest):
+    """Finish a direct upload and publish the same ingest message /ingest would."""
+    if not request.key.startswith(PRESIGNED_PREFIX):
+        raise HTTPException(status_code=422, detail="Not a presigned upload key")
+    parts = [{"ETag": p.etag, "PartNumber": p.part_number} for p in sorted(request.parts, key=lambda p: p.part_number)]
+    try:
+        s3.complete_multipart_upload(
+            Bucket=bucket_name, Key=request.key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+        )
+        head = s3.head_object(Bucket=bucket_name, Key=request.key)
+    except Exception:
+        logger.exception("Failed to complete presigned upload %s", upload_id)
+        raise HTTPException(status_code=500, detail="Failed to complete upload")
+    if not head.get("ServerSideEncryption"):
+        # Never ingest a plaintext object, e.g. one whose upload was started with SSE switched off.
+        logger.error("Presigned upload %s is not encrypted at rest; deleting it", request.key)
+        s3.delete_object(Bucket=bucket_name, Key=request.key)
+        raise HTTPException(status_code=409, detail="Upload was not encrypted at rest and has been discarded")
+    stored_metadata = head.get("Metadata", {})
+    filename = unquote(stored_metadata.get("filename", request.key.rsplit("/", 1)[-1]))
+    metadata = unquote(stored_metadata.get("ingest-metadata", ""))
+    publish({"filename": filename, "metadata": metadata, "object_key": request.key, "encryption": "sse"})
+    return IngestResponse(status="ingested", file=filename, metadata=metadata, size=head.get("ContentLength"))
+
+@app.delete("/uploads/presigned/{upload_id}")
+def abort_presigned_upload(upload_id: str, key: str):
+    if not key.startswith(PRESIGNED_PREFIX):
+        raise HTTPException(status_code=422, detail="Not a presigned upload key")
+    try:
+        s3.abort_multipart_upload(Bucket=bucket_name, Key=key, UploadId=upload_id)
+    except Exception:
+        logger.exception("Failed to abort presigned upload %s", upload_id)
+        raise HTTPException(status_code=500, detail="Failed to abort upload")
+    return {"status": "aborted"}
+
+def _parse_range(header: Optional[str], size: int):
+    if not header or not header.startswith("bytes="):
+        return 0, size
+    first, _, last = header[len("bytes="):].partition("-")
+    if not first:
+        return max(size - int(last), 0), size
+    return int(first), min(int(last) + 1, size) if last else size
+
+@app.get("/objects/{key:path}")
+def download_object(key: str, range_header: Optional[str] = Header(default=None, alias="Range")):
+    """Decrypt a stored object, honouring a single `Range: bytes=a-b` by fetching only covering segments."""
+    try:
+        head = s3.get_object(Bucket=bucket_name, Key=key, Range="bytes=0-3")["Body"].read()
+    except Exception:
+        logger.exception("Failed to read %s from bucket %s", key, bucket_name)
+        raise HTTPException(status_code=404, detail="Object not found")
+    if key.startswith(PRESIGNED_PREFIX):
+        # Direct uploads are only completed once MinIO has encrypted them (SSE); reads come back decrypted.
+        body = s3.get_object(Bucket=bucket_name, Key=key)["Body"]
+        return StreamingResponse(body.iter_chunks(), media_type="application/octet-stream")
+    if not is_segmented(head):
+        body = s3.get_object(Bucket=bucket_name, Key=key)["Body"]
+        return StreamingResponse(iter_legacy(body.iter_lines(), cipher), media_type="application/octet-stream")
+    reader = SegmentReader.from_s3(s3, bucket_name, key, blob_key)
+    try:
+        start, end = _parse_range(range_header, reader.plaintext_size)
+    except ValueError:
+        raise HTTPException(status_code=416, detail="Invalid range")
+    if range_header and start >= end:
+        raise HTTPException(status_code=416, detail="Range not satisfiable")
+    headers = {"Accept-Ranges": "bytes", "Content-Length": str(end - start)}
+    status = 200
+    if range_header:
+        status = 206
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{reader.plaintext_size}"
+    return StreamingResponse(
+        reader.iter_range(start, end), status_code=status, headers=headers, media_type="application/octet-stream"
+    )
 
 @app.get("/health")
 def health():
     return {"status": "ok", "bucket": bucket_name}
 
+@app.get("/metrics")
+def metrics(format: str = "json"):
+    if format == "prometheus":
+        return PlainTextResponse(pipeline_metrics.prometheus(), media_type="text/plain; version=0.0.4")
+    with PUBLISH_LOCK:
+        publish_metrics = dict(PUBLISH_STATS)
+        outbox_metrics = dict(OUTBOX_STATS)
+    with DEDUP_LOCK:
+        dedup_metrics = dict(DEDUP_STATS)
+    dedup_metrics["hit_rate"] = dedup_metrics["hits"] / dedup_metrics["uploads"] if dedup_metrics["uploads"] else 0.0
+    outbox_metrics.update(outbox.stats(), storage_healthy=STORAGE_HEALTHY.is_set())
+    try:
+        producer_metrics = producer.metrics().get("producer-metrics", {})
+    except Exception:
+        producer_metrics = {}
+    for name in ("batch-size-avg", "batch-size-max", "records-per-request-avg", "record-queue-time-avg"):
+        publish_metrics[name.replace("-", "_")] = producer_metrics.get(name)
+    return {
+        "pipeline": pipeline_metrics.snapshot(),
+        "publish": publish_metrics,
+        "outbox": outbox_metrics,
+        "dedup": dedup_metrics,
+    }
+
+@app.get("/manifest/{filename:path}")
+def get_manifest(filename: str):
+    history = manifest.history(filename)
+    if not history:
+        raise HTTPException(status_code=404, detail="No uploads recorded for this filename")
+    return {"filename": filename, "current": history[0], "history": history}
+
 @app.on_event("startup")
 def ensure_bucket():
     try:
@@ -71,3 +1055,23 @@ def ensure_bucket():
             logger.info("Created bucket %s", bucket_name)
     except Exception:
         logger.exception("Failed to ensure bucket %s exists", bucket_name)
+
+@app.on_event("startup")
+def start_outbox_drainer():
+    global DRAIN_THREAD
+    if DRAIN_THREAD and DRAIN_THREAD.is_alive():
+        return
+    DRAIN_STOP_EVENT.clear()
+    DRAIN_THREAD = threading.Thread(target=drain_outbox, args=(DRAIN_STOP_EVENT,), daemon=True)
+    DRAIN_THREAD.start()
+
+@app.on_event("shutdown")
+def stop_outbox_drainer():
+    DRAIN_STOP_EVENT.set()
+    if DRAIN_THREAD:
+        DRAIN_THREAD.join(timeout=2)
+    try:
+        producer.flush(timeout=10)
+    except Exception:
+        logger.exception("Failed to flush pending ingest messages on shutdown")
+    storage_executor.shutdown(wait=False)
@@ -1,15 +1,51 @@
+import ast
+import difflib
+import hashlib
+import json
 import logging
 import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
 from datetime import datetime, timedelta
+from typing import Dict, List, Optional
 
 from cryptography.fernet import Fernet
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from meilisearch import Client
-from pydantic import BaseModel
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text, create_engine
+from meilisearch.errors import MeilisearchApiError, MeilisearchCommunicationError, MeilisearchTimeoutError
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import (
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    JSON,
+    Integer,
+    String,
+    Text,
+    and_,
+    case,
+    create_engine,
+    exists,
+    func,
+    insert,
+    literal,
+    select,
+    tuple_,
+)
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 
+from shared.cryptopool import CryptoPool
+from shared.schema import create_schema
+
 app = FastAPI(title="Digital Library Service")
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
@@ -24,6 +60,236 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 meili = Client(os.getenv("MEILISEARCH_URL"), os.getenv("MEILISEARCH_API_KEY"))
+# Only reads get the short timeout, so search falls back to the local index instead of hanging;
+# indexing, reindex and swaps keep the default client and may legitimately take longer.
+MEILI_TIMEOUT = float(os.getenv("MEILI_TIMEOUT_SECONDS", "2"))
+search_meili = Client(os.getenv("MEILISEARCH_URL"), os.getenv("MEILISEARCH_API_KEY"), timeout=MEILI_TIMEOUT)
+
+LOCAL_SEARCH_PATH = os.getenv("LOCAL_SEARCH_PATH", "/var/lib/digital-library/literature-fts.sqlite3")
+LOCAL_SEARCH_CACHE_KB = int(os.getenv("LOCAL_SEARCH_CACHE_KB", "8192"))
+SEARCH_FALLBACK_COOLDOWN = float(os.getenv("SEARCH_FALLBACK_COOLDOWN_SECONDS", "30"))
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "1024"))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "60"))
+SEARCH_LIMIT_MAX = int(os.getenv("SEARCH_LIMIT_MAX", "100"))
+CURRENCY_PAGE_MAX = int(os.getenv("CURRENCY_PAGE_MAX", "5000"))
+CURRENCY_BUCKET_TTL = float(os.getenv("CURRENCY_BUCKET_TTL_SECONDS", "300"))
+# (label, lower bound in years stale, upper bound in years stale or None)
+CURRENCY_BUCKETS = [("0-1y", 0, 1), ("1-2y", 1, 2), ("2-5y", 2, 5), ("5y+", 5, None)]
+GRAPH_CACHE_SIZE = int(os.getenv("GRAPH_CACHE_SIZE", "512"))
+GRAPH_CACHE_TTL = float(os.getenv("GRAPH_CACHE_TTL_SECONDS", "300"))
+GRAPH_MAX_DEPTH = int(os.getenv("GRAPH_MAX_DEPTH", "6"))
+GRAPH_MAX_NODES = int(os.getenv("GRAPH_MAX_NODES", "1000"))
+CONTENT_CACHE_MAX_BYTES = int(os.getenv("CONTENT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CONTENT_CACHE_TTL = float(os.getenv("CONTENT_CACHE_TTL_SECONDS", "300"))  # 0 keeps entries until evicted
+
+class LatencyTracker:
+    """Count plus percentiles over a bounded window of recent samples."""
+
+    def __init__(self, window: int = 1024):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = sorted(self._samples)
+            count = self.count
+        if not samples:
+            return {"count": count, "p50_ms": None, "p95_ms": None, "max_ms": None}
+        pick = lambda q: round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1000, 3)
+        return {"count": count, "p50_ms": pick(0.5), "p95_ms": pick(0.95), "max_ms": round(samples[-1] * 1000, 3)}
+
+class LocalSearchIndex:
+    """Disk-backed SQLite FTS5 index used when Meilisearch is unreachable; memory is capped by the page cache."""
+
+    def __init__(self, path: str, cache_kb: int):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"PRAGMA cache_size=-{cache_kb}")
+        self._conn.execute("PRAGMA temp_store=FILE")
+        self._conn.execute("PRAGMA mmap_size=0")
+        self._conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS literature_fts USING fts5(title, content, tokenize='unicode61 remove_diacritics 2')"
+        )
+        self._conn.commit()
+
+    def upsert(self, docs: List[dict]):
+        with self._lock:
+            self._conn.executemany("DELETE FROM literature_fts WHERE rowid = ?", [(d["id"],) for d in docs])
+            self._conn.executemany(
+                "INSERT INTO literature_fts (rowid, title, content) VALUES (?, ?, ?)",
+                [(d["id"], d["title"], d["content"]) for d in docs],
+            )
+            self._conn.commit()
+
+    def search(self, q: str, limit: int) -> List[dict]:
+        terms = re.findall(r"\w+", q)
+        if not terms:
+            return []
+        # Quote every term so user input can never be parsed as FTS syntax; OR + bm25 ranks full matches first.
+        match = " OR ".join('"{}"*'.format(t) for t in terms)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT rowid, title, snippet(literature_fts, 1, '', '', '…', 24) FROM literature_fts "
+                "WHERE literature_fts MATCH ? ORDER BY bm25(literature_fts, 5.0, 1.0) LIMIT ?",
+                (match, limit),
+            ).fetchall()
+        return [{"id": r[0], "title": r[1], "content": r[2]} for r in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM literature_fts").fetchone()[0]
+
+class ResultCache:
+    """LRU + TTL cache of query responses, invalidated wholesale by bumping a generation counter.
+
+    A result computed while a write lands is tagged with the generation it started under and is
+    dropped on insert, so a concurrent write can never leave a stale entry behind.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.generation = 0
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0, "discarded": 0}
+
+    @staticmethod
+    def key(q: str, **options) -> tuple:
+        return (" ".join(q.lower().split()),) + tuple(sorted(options.items()))
+
+    def get(self, key: tuple):
+        """Return (cached result or None, generation to pass back to put)."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[1], self.generation
+            if entry:
+                del self._entries[key]
+            self.stats["misses"] += 1
+            return None, self.generation
+
+    def put(self, key: tuple, result, generation: int):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if generation != self.generation:
+                self.stats["discarded"] += 1
+                return
+            self._entries[key] = (time.monotonic(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def invalidate(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self.stats["invalidations"] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return dict(
+                self.stats,
+                size=len(self._entries),
+                generation=self.generation,
+                hit_rate=round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+            )
+
+class ContentCache:
+    """LRU cache of decrypted literature responses bounded by approximate byte size, with optional TTL."""
+
+    ENTRY_OVERHEAD = 256  # dict/tuple/str headers per entry, so tiny documents still count
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.bytes = 0
+        self._generation = 0
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    @classmethod
+    def _size(cls, value: dict) -> int:
+        return cls.ENTRY_OVERHEAD + sum(len(v) * (1 if v.isascii() else 4) for v in value.values() if isinstance(v, str))
+
+    def get(self, key: int):
+        """Return (cached value or None, token to pass back to put)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not entry[0] or entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return entry[2], self._generation
+                self._drop(key)
+                self.stats["expirations"] += 1
+            self.stats["misses"] += 1
+            return None, self._generation
+
+    def put(self, key: int, value: dict, token: int):
+        size = self._size(value)
+        if size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl > 0 else 0.0
+        with self._lock:
+            # An update landed between our read and this put; the value may predate it.
+            if token != self._generation:
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (expires_at, size, value)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+
+    def invalidate(self, key: int):
+        with self._lock:
+            self._generation += 1
+            self.stats["invalidations"] += 1
+            if key in self._entries:
+                self._drop(key)
+
+    def _drop(self, key: int):
+        self.bytes -= self._entries.pop(key)[1]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return dict(
+                self.stats,
+                entries=len(self._entries),
+                bytes=self.bytes,
+                max_bytes=self.max_bytes,
+                hit_rate=round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+            )
+
+local_index = LocalSearchIndex(LOCAL_SEARCH_PATH, LOCAL_SEARCH_CACHE_KB)
+search_cache = ResultCache(SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL)
+graph_cache = ResultCache(GRAPH_CACHE_SIZE, GRAPH_CACHE_TTL)
+currency_cache = ResultCache(1, CURRENCY_BUCKET_TTL)
+content_cache = ContentCache(CONTENT_CACHE_MAX_BYTES, CONTENT_CACHE_TTL)
+SEARCH_LOCK = threading.Lock()
+SEARCH_STATE = {"meili_down_until": 0.0, "fallbacks": 0}
+MEILI_SEARCH_LATENCY = LatencyTracker()
+LOCAL_SEARCH_LATENCY = LatencyTracker()
 
 def load_cipher() -> Fernet:
     key = os.getenv("ENCRYPTION_KEY")
@@ -38,33 +304,96 @@ class Literature(Base):
     id = Column(Integer, primary_key=True)
     title = Column(String)
     content = Column(Text)
-    redacted = Column(Text)  # JSON of redaction info
-    provenance = Column(Text)  # JSON of changes
+    redacted = Column(Text)  # JSON of redaction info (older rows hold a Python dict repr)
+    provenance = Column(Text)  # JSON of the last change; full history lives in literature_provenance
     currency_date = Column(DateTime)  # For currency metrics
     created_at = Column(DateTime, default=datetime.utcnow)
-    links = relationship("LiteratureLink", back_populates="literature")
+    # Keyset order for the currency audit: (currency_date, id).
+    __table_args__ = (Index("ix_literature_currency_date_id", "currency_date", "id"),)
+    links = relationship("LiteratureLink", back_populates="literature", foreign_keys="LiteratureLink.literature_id")
     versions = relationship("LiteratureVersion", back_populates="literature")
 
 class LiteratureLink(Base):
     __tablename__ = "literature_links"
     id = Column(Integer, primary_key=True)
-    literature_id = Column(Integer, ForeignKey("literature.id"))
+    literature_id = Column(Integer, ForeignKey("literature.id"), index=True)  # graph walks follow out-links
     linked_id = Column(Integer, ForeignKey("literature.id"))
     link_type = Column(String)  # e.g., "related", "cites", "redacted_from"
     literature = relationship("Literature", foreign_keys=[literature_id], back_populates="links")
     linked = relationship("Literature", foreign_keys=[linked_id])
 
+class LiteratureIndexQueue(Base):
+    """Transactional outbox of literature ids whose search documents need (re)indexing."""
+    __tablename__ = "literature_index_queue"
+    id = Column(Integer, primary_key=True)
+    literature_id = Column(Integer, index=True)
+    enqueued_at = Column(DateTime, default=datetime.utcnow)
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+class ReindexCheckpoint(Base):
+    """Progress of a full search reindex into a shadow index, so an interrupted run can resume."""
+    __tablename__ = "literature_reindex_checkpoints"
+    id = Column(Integer, primary_key=True)
+    shadow_uid = Column(String, nullable=False)
+    last_id = Column(Integer, default=0)
+    indexed = Column(Integer, default=0)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
 class LiteratureVersion(Base):
     __tablename__ = "literature_versions"
     id = Column(Integer, primary_key=True)
     literature_id = Column(Integer, ForeignKey("literature.id"))
-    content = Column(Text)
+    content = Column(Text)  # legacy Fernet token, or a VERSION_SNAPSHOT / VERSION_DELTA envelope
     change_reason = Column(String)
     changed_by = Column(String)  # e.g., "user" or "system"
     changed_at = Column(DateTime, default=datetime.utcnow)
     literature = relationship("Literature", back_populates="versions")
 
-Base.metadata.create_all(bind=engine)
+class ProvenanceEvent(Base):
+    """One row per change to a literature item; the queryable audit trail behind Literature.provenance."""
+    __tablename__ = "literature_provenance"
+    id = Column(Integer, primary_key=True)
+    literature_id = Column(Integer, ForeignKey("literature.id"), nullable=False)
+    action = Column(String, nullable=False, index=True)  # created, updated, redacted, linked
+    changed_by = Column(String, index=True)
+    reason = Column(String, index=True)
+    at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    version_id = Column(Integer, ForeignKey("literature_versions.id"), unique=True)
+    details = Column(JSON().with_variant(JSONB(), "postgresql"))
+    __table_args__ = (Index("ix_literature_provenance_literature_at", "literature_id", "at"),)
+
+create_schema(Base.metadata, engine)
+
+INDEX_BATCH_SIZE = int(os.getenv("INDEX_BATCH_SIZE", "500"))
+INDEX_FLUSH_INTERVAL = float(os.getenv("INDEX_FLUSH_INTERVAL_SECONDS", "1"))
+INDEX_MAX_BACKOFF = float(os.getenv("INDEX_MAX_BACKOFF_SECONDS", "300"))
+DISABLE_INDEX_WORKER = os.getenv("DISABLE_INDEX_WORKER", "false").lower() == "true"
+INDEX_LOCK = threading.Lock()
+INDEX_STATS = {"indexed": 0, "batches": 0, "failed_batches": 0, "last_batch_size": 0}
+INDEX_STOP_EVENT = threading.Event()
+INDEX_THREAD: Optional[threading.Thread] = None
+
+REINDEX_BATCH_SIZE = int(os.getenv("REINDEX_BATCH_SIZE", "1000"))
+REINDEX_TASK_TIMEOUT_MS = int(os.getenv("REINDEX_TASK_TIMEOUT_MS", "120000"))
+CONSISTENCY_PAGE_SIZE = int(os.getenv("CONSISTENCY_PAGE_SIZE", "1000"))
+REINDEX_LOCK = threading.Lock()
+REINDEX_STATUS = {"state": "idle", "shadow_uid": None, "last_id": 0, "indexed": 0, "error": None}
+REINDEX_THREAD: Optional[threading.Thread] = None
+
+PROVENANCE_PAGE_MAX = int(os.getenv("PROVENANCE_PAGE_MAX", "1000"))
+VERSION_SNAPSHOT_INTERVAL = int(os.getenv("VERSION_SNAPSHOT_INTERVAL", "10"))
+# Version payloads are zlib-compressed then Fernet-encrypted; the prefix says how to rebuild the text.
+VERSION_SNAPSHOT = "s1:"
+VERSION_DELTA = "d1:"
+
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "1000"))
+ENCRYPT_WORKERS = int(os.getenv("ENCRYPT_WORKERS", str(os.cpu_count() or 2)))
+CRYPTO_PARALLEL_MIN = int(os.getenv("CRYPTO_PARALLEL_MIN", "256"))
+CRYPTO_CHUNK_SIZE = int(os.getenv("CRYPTO_CHUNK_SIZE", "64"))
+
+crypto_pool = CryptoPool(os.environ["ENCRYPTION_KEY"].encode(), ENCRYPT_WORKERS, CRYPTO_PARALLEL_MIN, CRYPTO_CHUNK_SIZE)
 
 class LiteratureCreate(BaseModel):
     title: str
@@ -72,73 +401,238 @@ class LiteratureCreate(BaseModel):
     redacted: bool = False
     redaction_reason: str = ""
     currency_date: str = None  # ISO format
+    changed_by: str = "user"
 
 class LinkCreate(BaseModel):
     linked_id: int
     link_type: str
+    changed_by: str = "user"
 
 class VersionUpdate(BaseModel):
     content: str
     change_reason: str
     changed_by: str = "user"
 
+def _parse_currency(item: LiteratureCreate) -> datetime:
+    return datetime.fromisoformat(item.currency_date) if item.currency_date else datetime.utcnow()
+
+def _redaction_info(item: LiteratureCreate) -> dict:
+    return {"redacted": item.redacted, "reason": item.redaction_reason} if item.redacted else {}
+
+def _creation_events(literature_id: int, item: LiteratureCreate, at: datetime) -> List[dict]:
+    events = [{"literature_id": literature_id, "action": "created", "changed_by": item.changed_by, "at": at}]
+    if item.redacted:
+        events.append({
+            "literature_id": literature_id, "action": "redacted", "changed_by": item.changed_by,
+            "reason": item.redaction_reason, "at": at,
+        })
+    return events
+
 @app.post("/literature")
 def create_literature(item: LiteratureCreate):
     with SessionLocal() as db:
         encrypted_content = cipher.encrypt(item.content.encode())
-        redaction_info = {"redacted": item.redacted, "reason": item.redaction_reason} if item.redacted else {}
+        redaction_info = _redaction_info(item)
         try:
-            currency = datetime.fromisoformat(item.currency_date) if item.currency_date else datetime.utcnow()
+            currency = _parse_currency(item)
         except Exception:
             raise HTTPException(status_code=422, detail="Invalid currency_date format. Use ISO 8601.")
         lit = Literature(
             title=item.title,
             content=encrypted_content.decode(),
-            redacted=str(redaction_info),
+            redacted=json.dumps(redaction_info),
             currency_date=currency,
         )
         try:
             db.add(lit)
+            db.flush()
+            db.add(LiteratureIndexQueue(literature_id=lit.id))
+            db.execute(insert(ProvenanceEvent), _creation_events(lit.id, item, lit.created_at))
             db.commit()
             db.refresh(lit)
         except Exception:
             db.rollback()
             logger.exception("Failed to persist literature")
             raise HTTPException(status_code=500, detail="Failed to create literature")
-    try:
-        meili.index('literature').add_documents([{"id": lit.id, "title": lit.title, "content": item.content}])
-    except Exception:
-        logger.exception("Failed to index literature %s", lit.id)
+    _index_locally([{"id": lit.id, "title": item.title, "content": item.content}])
+    currency_cache.invalidate()
     return lit
 
+def _insert_bulk_batch(batch: List[tuple]) -> List[dict]:
+    """Encrypt a batch in parallel and insert it, with its index queue rows, in one transaction."""
+    encrypted = crypto_pool.encrypt([item.content for _, item, _ in batch])
+    now = datetime.utcnow()
+    rows = [
+        {
+            "title": item.title,
+            "content": content,
+            "redacted": json.dumps(_redaction_info(item)),
+            "currency_date": currency,
+            "created_at": now,
+        }
+        for (_, item, currency), content in zip(batch, encrypted)
+    ]
+    with SessionLocal() as db:
+        try:
+            ids = db.execute(
+                insert(Literature).returning(Literature.id, sort_by_parameter_order=True), rows
+            ).scalars().all()
+            db.execute(insert(LiteratureIndexQueue), [{"literature_id": i} for i in ids])
+            db.execute(
+                insert(ProvenanceEvent),
+                [event for (_, item, _), lit_id in zip(batch, ids) for event in _creation_events(lit_id, item, now)],
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.exception("Failed to persist bulk batch of %d literature records", len(batch))
+            return [{"line": line, "error": "Failed to persist batch"} for line, _, _ in batch]
+    _index_locally([{"id": lit_id, "title": item.title, "content": item.content} for (_, item, _), lit_id in zip(batch, ids)])
+    currency_cache.invalidate()
+    return [{"line": line, "id": lit_id} for (line, _, _), lit_id in zip(batch, ids)]
+
+@app.post("/literature/bulk")
+async def bulk_create_literature(request: Request):
+    """Import NDJSON (one LiteratureCreate per line); returns an id or an error for every line."""
+    results: List[dict] = []
+    batch: List[tuple] = []
+    line_number = 0
+    buffered = b""
+
+    async def flush():
+        if batch:
+            results.extend(await run_in_threadpool(_insert_bulk_batch, list(batch)))
+            batch.clear()
+
+    async def handle(raw: bytes):
+        nonlocal line_number
+        line_number += 1
+        if not raw.strip():
+            return
+        try:
+            item = LiteratureCreate.model_validate_json(raw)
+        except ValidationError as exc:
+            results.append({"line": line_number, "error": exc.errors(include_url=False)[0]["msg"]})
+            return
+        try:
+            currency = _parse_currency(item)
+        except ValueError:
+            results.append({"line": line_number, "error": "Invalid currency_date format. Use ISO 8601."})
+            return
+        batch.append((line_number, item, currency))
+        if len(batch) >= BULK_BATCH_SIZE:
+            await flush()
+
+    async for chunk in request.stream():
+        buffered += chunk
+        *lines, buffered = buffered.split(b"\n")
+        for raw in lines:
+            await handle(raw)
+    await handle(buffered)
+    await flush()
+    results.sort(key=lambda r: r["line"])
+    inserted = sum(1 for r in results if "id" in r)
+    return {"inserted": inserted, "errors": len(results) - inserted, "results": results}
+
+def _seal_version(prefix: str, payload: str) -> str:
+    return prefix + cipher.encrypt(zlib.compress(payload.encode(), 6)).decode()
+
+def _line_delta(base: str, text: str) -> str:
+    """Encode text as JSON ops against base: [start, end] copies base lines, a string inserts literally."""
+    base_lines, lines = base.splitlines(keepends=True), text.splitlines(keepends=True)
+    ops = []
+    matcher = difflib.SequenceMatcher(None, base_lines, lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif tag in ("replace", "insert"):
+            ops.append("".join(lines[j1:j2]))
+    return json.dumps(ops, separators=(",", ":"))
+
+def _open_version(content: str, previous: Optional[str]) -> str:
+    if content.startswith(VERSION_DELTA):
+        base_lines = previous.splitlines(keepends=True)
+        ops = json.loads(zlib.decompress(cipher.decrypt(content[len(VERSION_DELTA):].encode())))
+        return "".join(op if isinstance(op, str) else "".join(base_lines[op[0]:op[1]]) for op in ops)
+    if content.startswith(VERSION_SNAPSHOT):
+        return zlib.decompress(cipher.decrypt(content[len(VERSION_SNAPSHOT):].encode())).decode()
+    return cipher.decrypt(content.encode()).decode()
+
+def _materialize_version(db, literature_id: int, number: int):
+    """Rebuild version `number` (1-based) from the nearest full copy; returns (row, text, chain_length)."""
+    if number < 1:
+        return None, None, 0  # checked first: a negative OFFSET is an error in Postgres
+    versions = db.query(LiteratureVersion).filter(LiteratureVersion.literature_id == literature_id)
+    target = versions.order_by(LiteratureVersion.id).offset(number - 1).limit(1).first()
+    if target is None:
+        return None, None, 0
+    base_id = (
+        db.query(func.max(LiteratureVersion.id))
+        .filter(
+            LiteratureVersion.literature_id == literature_id,
+            LiteratureVersion.id <= target.id,
+            ~LiteratureVersion.content.startswith(VERSION_DELTA),
+        )
+        .scalar()
+    )
+    chain = (
+        db.query(LiteratureVersion.content)
+        .filter(
+            LiteratureVersion.literature_id == literature_id,
+            LiteratureVersion.id >= base_id,
+            LiteratureVersion.id <= target.id,
+        )
+        .order_by(LiteratureVersion.id)
+        .all()
+    )
+    text = None
+    for (content,) in chain:
+        text = _open_version(content, text)
+    return target, text, len(chain)
+
+def _encode_version(db, literature_id: int, text: str) -> str:
+    """Store text as a delta against the previous version, or as a snapshot every VERSION_SNAPSHOT_INTERVAL."""
+    count = db.query(func.count(LiteratureVersion.id)).filter(LiteratureVersion.literature_id == literature_id).scalar()
+    if count:
+        _, previous, chain_length = _materialize_version(db, literature_id, count)
+        if chain_length < VERSION_SNAPSHOT_INTERVAL:
+            return _seal_version(VERSION_DELTA, _line_delta(previous, text))
+    return _seal_version(VERSION_SNAPSHOT, text)
+
 @app.put("/literature/{id}")
 def update_literature(id: int, update: VersionUpdate):
     with SessionLocal() as db:
-        lit = db.query(Literature).filter(Literature.id == id).first()
+        # Row lock serialises edits per document so each delta is taken against its true predecessor.
+        lit = db.query(Literature).filter(Literature.id == id).with_for_update().first()
         if not lit:
             raise HTTPException(status_code=404, detail="Not found")
         version = LiteratureVersion(
             literature_id=id,
-            content=lit.content,
+            content=_encode_version(db, id, cipher.decrypt(lit.content.encode()).decode()),
             change_reason=update.change_reason,
             changed_by=update.changed_by,
         )
         db.add(version)
+        db.flush()
         encrypted_content = cipher.encrypt(update.content.encode())
         lit.content = encrypted_content.decode()
-        lit.provenance = str(
-            {"last_change": update.change_reason, "changed_by": update.changed_by, "at": str(datetime.utcnow())}
+        lit.provenance = json.dumps(
+            {"last_change": update.change_reason, "changed_by": update.changed_by, "at": version.changed_at.isoformat()}
         )
+        db.add(ProvenanceEvent(
+            literature_id=id, action="updated", changed_by=update.changed_by, reason=update.change_reason,
+            at=version.changed_at, version_id=version.id,
+        ))
+        db.add(LiteratureIndexQueue(literature_id=id))
+        title = lit.title
         try:
             db.commit()
         except Exception:
             db.rollback()
             logger.exception("Failed to update literature %s", id)
             raise HTTPException(status_code=500, detail="Failed to update literature")
-    try:
-        meili.index('literature').update_documents([{"id": lit.id, "content": update.content}])
-    except Exception:
-        logger.exception("Failed to update index for literature %s", id)
+    content_cache.invalidate(id)
+    _index_locally([{"id": id, "title": title, "content": update.content}])
     return lit
 
 @app.post("/literature/{id}/link")
@@ -152,14 +646,106 @@ def add_link(id: int, link: LinkCreate):
             raise HTTPException(status_code=404, detail="Linked literature not found")
         new_link = LiteratureLink(literature_id=id, linked_id=link.linked_id, link_type=link.link_type)
         db.add(new_link)
+        db.add(ProvenanceEvent(
+            literature_id=id, action="linked", changed_by=link.changed_by, reason=link.link_type,
+            details={"linked_id": link.linked_id, "link_type": link.link_type},
+        ))
         try:
             db.commit()
         except Exception:
             db.rollback()
             logger.exception("Failed to link literature %s -> %s", id, link.linked_id)
             raise HTTPException(status_code=500, detail="Failed to create link")
+    graph_cache.invalidate()
     return {"status": "linked"}
 
+def _walk_links(db, root: int, depth: int, types: List[str], max_nodes: int):
+    """Nodes reachable from root within depth hops, with their shortest hop count, via one recursive CTE.
+
+    UNION (not UNION ALL) dedupes (node, depth) pairs, so cycles cost at most one row per node per level.
+    """
+    walk = select(literal(root, Integer).label("node"), literal(0, Integer).label("depth")).cte("walk", recursive=True)
+    step = (
+        select(LiteratureLink.linked_id, walk.c.depth + 1)
+        .join(walk, LiteratureLink.literature_id == walk.c.node)
+        .where(walk.c.depth < depth)
+    )
+    if types:
+        step = step.where(LiteratureLink.link_type.in_(types))
+    walk = walk.union(step)
+    hops = func.min(walk.c.depth).label("depth")
+    return db.execute(
+        select(walk.c.node, hops, Literature.title)
+        .join(Literature, Literature.id == walk.c.node)
+        .group_by(walk.c.node, Literature.title)
+        .order_by(hops, walk.c.node)
+        .limit(max_nodes + 1)
+    ).all()
+
+def _back_edges(root: int, edges) -> set:
+    """Indices of edges whose target is an ancestor of their source on a depth-first walk from root."""
+    outgoing: Dict[int, List[int]] = {}
+    for i, (src, _, _) in enumerate(edges):
+        outgoing.setdefault(src, []).append(i)
+    back, on_path, seen = set(), {root}, {root}
+    stack = [(root, iter(outgoing.get(root, ())))]
+    while stack:
+        node, pending = stack[-1]
+        i = next(pending, None)
+        if i is None:
+            stack.pop()
+            on_path.discard(node)
+            continue
+        dst = edges[i][1]
+        if dst in on_path:
+            back.add(i)
+        elif dst not in seen:
+            seen.add(dst)
+            on_path.add(dst)
+            stack.append((dst, iter(outgoing.get(dst, ()))))
+    return back
+
+@app.get("/literature/{id}/graph")
+def get_literature_graph(id: int, depth: int = 2, types: Optional[str] = None, max_nodes: int = 200):
+    if not 1 <= depth <= GRAPH_MAX_DEPTH:
+        raise HTTPException(status_code=422, detail=f"depth must be between 1 and {GRAPH_MAX_DEPTH}")
+    if not 1 <= max_nodes <= GRAPH_MAX_NODES:
+        raise HTTPException(status_code=422, detail=f"max_nodes must be between 1 and {GRAPH_MAX_NODES}")
+    link_types = sorted({t.strip() for t in types.split(",") if t.strip()}) if types else []
+    cache_key = (id, depth, tuple(link_types), max_nodes)
+    cached, generation = graph_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    with SessionLocal() as db:
+        rows = _walk_links(db, id, depth, link_types, max_nodes)
+        if not rows:
+            raise HTTPException(status_code=404, detail="Not found")
+        truncated = len(rows) > max_nodes
+        hops = {row.node: row.depth for row in rows[:max_nodes]}
+        # Only edges leaving nodes inside the horizon were walked; frontier nodes keep their out-links hidden.
+        edge_query = db.query(LiteratureLink.literature_id, LiteratureLink.linked_id, LiteratureLink.link_type).filter(
+            LiteratureLink.literature_id.in_([n for n, d in hops.items() if d < depth]),
+            LiteratureLink.linked_id.in_(list(hops)),
+        )
+        if link_types:
+            edge_query = edge_query.filter(LiteratureLink.link_type.in_(link_types))
+        edges = edge_query.order_by(LiteratureLink.id).all()
+    back = _back_edges(id, edges)
+    graph = {
+        "root": id,
+        "depth": depth,
+        "types": link_types,
+        "nodes": [{"id": row.node, "title": row.title, "depth": row.depth} for row in rows[:max_nodes]],
+        # Only back edges close a cycle; cross links between branches (R->A, R->B, B->A) do not.
+        "edges": [
+            {"source": src, "target": dst, "type": link_type, "cycle": i in back}
+            for i, (src, dst, link_type) in enumerate(edges)
+        ],
+        "truncated": truncated,
+    }
+    graph_cache.put(cache_key, graph, generation)
+    return graph
+
 @app.get("/literature/{id}/map")
 def get_literature_map(id: int):
     with SessionLocal() as db:
@@ -167,47 +753,537 @@ def get_literature_map(id: int):
         if not lit:
             raise HTTPException(status_code=404, detail="Not found")
         links = db.query(LiteratureLink).filter(LiteratureLink.literature_id == id).all()
-        versions = db.query(LiteratureVersion).filter(LiteratureVersion.literature_id == id).all()
+        # Metadata only: version payloads are never loaded for the map.
+        versions = (
+            db.query(LiteratureVersion.id, LiteratureVersion.change_reason, LiteratureVersion.changed_by, LiteratureVersion.changed_at)
+            .filter(LiteratureVersion.literature_id == id)
+            .order_by(LiteratureVersion.id)
+            .all()
+        )
     map_data = {
         "id": lit.id,
         "title": lit.title,
         "links": [{"linked_id": l.linked_id, "type": l.link_type} for l in links],
-        "versions": [{"id": v.id, "change_reason": v.change_reason, "changed_by": v.changed_by, "at": v.changed_at.isoformat()} for v in versions],
+        "versions": [
+            {"id": v.id, "version": n, "change_reason": v.change_reason, "changed_by": v.changed_by, "at": v.changed_at.isoformat()}
+            for n, v in enumerate(versions, start=1)
+        ],
         "provenance": lit.provenance,
         "currency": lit.currency_date.isoformat() if lit.currency_date else None
     }
     return map_data
 
+@app.get("/literature/{id}/versions/{number}")
+def get_literature_version(id: int, number: int):
+    with SessionLocal() as db:
+        try:
+            version, content, _ = _materialize_version(db, id, number)
+        except Exception:
+            logger.exception("Failed to materialise version %s of literature %s", number, id)
+            raise HTTPException(status_code=500, detail="Failed to read version")
+        if version is None:
+            raise HTTPException(status_code=404, detail="Version not found")
+    return {
+        "id": id,
+        "version": number,
+        "content": content,
+        "change_reason": version.change_reason,
+        "changed_by": version.changed_by,
+        "at": version.changed_at.isoformat(),
+    }
+
+def _parse_currency_cursor(cursor: str):
+    try:
+        stamp, lit_id = cursor.rsplit(",", 1)
+        return datetime.fromisoformat(stamp), int(lit_id)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Invalid cursor")
+
 @app.get("/literature/currency")
-def check_currency(days_old: int = 365):
+def check_currency(days_old: int = 365, limit: int = 500, after: Optional[str] = None):
+    """Stream one page of stale items, most stale first; pass next_cursor back as `after` for the next page."""
+    if not 1 <= limit <= CURRENCY_PAGE_MAX:
+        raise HTTPException(status_code=422, detail=f"limit must be between 1 and {CURRENCY_PAGE_MAX}")
+    cutoff = datetime.utcnow() - timedelta(days=days_old)
+    query = (
+        select(Literature.id, Literature.title, Literature.currency_date)
+        .where(Literature.currency_date < cutoff)
+        .order_by(Literature.currency_date, Literature.id)
+        .limit(limit + 1)
+    )
+    if after:
+        query = query.where(tuple_(Literature.currency_date, Literature.id) > tuple_(*_parse_currency_cursor(after)))
+
+    def stream():
+        yield '{"days_old":%d,"cutoff":%s,"items":[' % (days_old, json.dumps(cutoff.isoformat()))
+        last, next_cursor = None, None
+        with SessionLocal() as db:
+            for n, row in enumerate(db.execute(query.execution_options(yield_per=500))):
+                if n == limit:
+                    next_cursor = f"{last.currency_date.isoformat()},{last.id}"
+                    break
+                item = {"id": row.id, "title": row.title, "currency_date": row.currency_date.isoformat()}
+                yield ("," if n else "") + json.dumps(item)
+                last = row
+        yield '],"next_cursor":%s}' % json.dumps(next_cursor)
+
+    return StreamingResponse(stream(), media_type="application/json")
+
+@app.get("/literature/currency/buckets")
+def currency_buckets():
+    """Counts of items per staleness band, cached until the next create or CURRENCY_BUCKET_TTL_SECONDS."""
+    cached, generation = currency_cache.get(("buckets",))
+    if cached is not None:
+        return cached
+    now = datetime.utcnow()
+    year = timedelta(days=365)
+    counts = []
+    for _, lower, upper in CURRENCY_BUCKETS:
+        condition = Literature.currency_date <= now - lower * year
+        if upper is not None:
+            condition = condition & (Literature.currency_date > now - upper * year)
+        counts.append(func.count(case((condition, 1))))
+    counts.append(func.count(case((Literature.currency_date.is_(None), 1))))
     with SessionLocal() as db:
-        cutoff = datetime.utcnow() - timedelta(days=days_old)
-        outdated = db.query(Literature).filter(Literature.currency_date < cutoff).all()
-    return [{"id": l.id, "title": l.title, "currency_date": l.currency_date.isoformat()} for l in outdated]
+        row = db.execute(select(*counts)).one()
+    labels = [label for label, _, _ in CURRENCY_BUCKETS] + ["undated"]
+    result = {"computed_at": now.isoformat(), "buckets": dict(zip(labels, row))}
+    currency_cache.put(("buckets",), result, generation)
+    return result
+
+@app.get("/provenance")
+def query_provenance(
+    literature_id: Optional[int] = None,
+    action: Optional[str] = None,
+    changed_by: Optional[str] = None,
+    reason: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = 100,
+    after: Optional[str] = None,
+):
+    """Filter provenance events newest first; pass next_cursor back as `after` for the next page."""
+    if not 1 <= limit <= PROVENANCE_PAGE_MAX:
+        raise HTTPException(status_code=422, detail=f"limit must be between 1 and {PROVENANCE_PAGE_MAX}")
+    query = select(ProvenanceEvent)
+    for column, value in (
+        (ProvenanceEvent.literature_id, literature_id),
+        (ProvenanceEvent.action, action),
+        (ProvenanceEvent.changed_by, changed_by),
+        (ProvenanceEvent.reason, reason),
+    ):
+        if value is not None:
+            query = query.where(column == value)
+    if since:
+        query = query.where(ProvenanceEvent.at >= since)
+    if until:
+        query = query.where(ProvenanceEvent.at < until)
+    if after:
+        try:
+            stamp, event_id = after.rsplit(",", 1)
+            cursor = (datetime.fromisoformat(stamp), int(event_id))
+        except ValueError:
+            raise HTTPException(status_code=422, detail="Invalid cursor")
+        query = query.where(tuple_(ProvenanceEvent.at, ProvenanceEvent.id) < tuple_(*cursor))
+    with SessionLocal() as db:
+        events = db.execute(query.order_by(ProvenanceEvent.at.desc(), ProvenanceEvent.id.desc()).limit(limit + 1)).scalars().all()
+    page = events[:limit]
+    return {
+        "items": [
+            {
+                "id": e.id,
+                "literature_id": e.literature_id,
+                "action": e.action,
+                "changed_by": e.changed_by,
+                "reason": e.reason,
+                "at": e.at.isoformat(),
+                "version_id": e.version_id,
+                "details": e.details,
+            }
+            for e in page
+        ],
+        "next_cursor": f"{page[-1].at.isoformat()},{page[-1].id}" if len(events) > limit else None,
+    }
+
+def _legacy_dict(raw: Optional[str]) -> dict:
+    """Parse JSON or the Python dict repr older rows were written with."""
+    if not raw:
+        return {}
+    try:
+        return json.loads(raw)
+    except ValueError:
+        try:
+            return ast.literal_eval(raw)
+        except (ValueError, SyntaxError):
+            return {}
+
+@app.post("/admin/provenance/backfill")
+def backfill_provenance():
+    """Derive events for rows written before the provenance table existed; safe to run repeatedly."""
+    with SessionLocal() as db:
+        try:
+            versions = db.execute(
+                insert(ProvenanceEvent).from_select(
+                    ["literature_id", "action", "changed_by", "reason", "at", "version_id"],
+                    select(
+                        LiteratureVersion.literature_id, literal("updated"), LiteratureVersion.changed_by,
+                        LiteratureVersion.change_reason, LiteratureVersion.changed_at, LiteratureVersion.id,
+                    ).where(~exists().where(ProvenanceEvent.version_id == LiteratureVersion.id)),
+                )
+            ).rowcount
+            has_created = exists().where(
+                and_(ProvenanceEvent.literature_id == Literature.id, ProvenanceEvent.action == "created")
+            )
+            missing = db.execute(select(Literature.id, Literature.created_at, Literature.redacted).where(~has_created)).all()
+            events = []
+            for lit_id, created_at, redacted in missing:
+                at = created_at or datetime.utcnow()
+                events.append({"literature_id": lit_id, "action": "created", "at": at})
+                info = _legacy_dict(redacted)
+                if info.get("redacted"):
+                    events.append({"literature_id": lit_id, "action": "redacted", "reason": info.get("reason"), "at": at})
+            if events:
+                db.execute(insert(ProvenanceEvent), events)
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.exception("Provenance backfill failed")
+            raise HTTPException(status_code=500, detail="Provenance backfill failed")
+    return {"version_events": versions, "created_events": len(missing)}
+
+def _index_locally(docs: List[dict]):
+    search_cache.invalidate()
+    try:
+        local_index.upsert(docs)
+    except Exception:
+        # Meilisearch remains the source of search truth; a reindex reseeds the fallback.
+        logger.exception("Failed to update local search index for %d documents", len(docs))
+
+def _meili_unreachable(exc: Exception) -> bool:
+    if isinstance(exc, MeilisearchApiError):
+        return exc.status_code >= 500
+    return isinstance(exc, (MeilisearchCommunicationError, MeilisearchTimeoutError, ConnectionError, TimeoutError))
 
 @app.get("/literature/search")
-def search_literature(q: str):
+def search_literature(q: str, limit: int = Query(20, ge=1, le=SEARCH_LIMIT_MAX)):
+    cache_key = ResultCache.key(q, limit=limit)
+    cached, generation = search_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    with SEARCH_LOCK:
+        meili_available = time.monotonic() >= SEARCH_STATE["meili_down_until"]
+    if meili_available:
+        started = time.perf_counter()
+        try:
+            results = search_meili.index('literature').search(q, {'limit': limit})
+            MEILI_SEARCH_LATENCY.observe(time.perf_counter() - started)
+            # Only Meilisearch answers are cached, so recovery from a fallback is visible immediately.
+            search_cache.put(cache_key, results, generation)
+            return results
+        except Exception as exc:
+            if _meili_unreachable(exc):
+                logger.warning("Meilisearch search failed for query %s; using local index for %ss", q, SEARCH_FALLBACK_COOLDOWN, exc_info=True)
+                with SEARCH_LOCK:
+                    SEARCH_STATE["meili_down_until"] = time.monotonic() + SEARCH_FALLBACK_COOLDOWN
+            else:
+                # A rejected query says nothing about Meilisearch's health; answer locally this once.
+                logger.warning("Meilisearch rejected query %s; using local index", q, exc_info=True)
+    started = time.perf_counter()
     try:
-        results = meili.index('literature').search(q)
+        hits = local_index.search(q, limit)
     except Exception:
-        logger.exception("Search failed for query %s", q)
+        logger.exception("Local search failed for query %s", q)
         raise HTTPException(status_code=500, detail="Search failed")
-    return results
+    elapsed = time.perf_counter() - started
+    LOCAL_SEARCH_LATENCY.observe(elapsed)
+    with SEARCH_LOCK:
+        SEARCH_STATE["fallbacks"] += 1
+    return {"hits": hits, "query": q, "limit": limit, "processingTimeMs": round(elapsed * 1000), "source": "local"}
 
 @app.get("/literature/{id}")
 def get_literature(id: int):
+    cached, token = content_cache.get(id)
+    if cached is not None:
+        return cached
     with SessionLocal() as db:
         lit = db.query(Literature).filter(Literature.id == id).first()
         if not lit:
             raise HTTPException(status_code=404, detail="Not found")
     decrypted = cipher.decrypt(lit.content.encode()).decode()
-    return {
+    result = {
         "id": lit.id,
         "title": lit.title,
         "content": decrypted,
         "redacted": lit.redacted,
         "provenance": lit.provenance,
     }
+    content_cache.put(id, result, token)
+    return result
+
+def _document_stamp(lit: Literature) -> str:
+    """Cheap fingerprint of the indexed fields; Fernet tokens change on every write, so it tracks updates."""
+    return hashlib.sha256(f"{lit.title}\0{lit.content}".encode()).hexdigest()[:16]
+
+def _search_document(lit: Literature) -> dict:
+    return {
+        "id": lit.id,
+        "title": lit.title,
+        "content": cipher.decrypt(lit.content.encode()).decode(),
+        "stamp": _document_stamp(lit),
+    }
+
+def drain_index_queue(limit: int = INDEX_BATCH_SIZE) -> int:
+    """Index one batch from the queue, coalescing repeated ids; returns the number of queue rows handled."""
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        queued = (
+            db.query(LiteratureIndexQueue)
+            .filter(LiteratureIndexQueue.next_attempt_at <= now)
+            .order_by(LiteratureIndexQueue.id)
+            .limit(limit)
+            .all()
+        )
+        if not queued:
+            return 0
+        # The document is built from the current row, so many queued edits collapse into one write.
+        ids = {q.literature_id for q in queued}
+        docs = []
+        for lit in db.query(Literature).filter(Literature.id.in_(ids)).all():
+            try:
+                docs.append(_search_document(lit))
+            except Exception:
+                logger.exception("Failed to decrypt literature %s for indexing", lit.id)
+        try:
+            if docs:
+                # add_documents only enqueues a task; results change once Meilisearch has applied it.
+                _wait_for_meili(meili.index('literature').add_documents(docs))
+        except Exception:
+            logger.exception("Failed to index batch of %d literature documents", len(docs))
+            for q in queued:
+                q.attempts += 1
+                q.next_attempt_at = now + timedelta(seconds=min(2 ** q.attempts, INDEX_MAX_BACKOFF))
+            db.commit()
+            with INDEX_LOCK:
+                INDEX_STATS["failed_batches"] += 1
+            return 0
+        db.query(LiteratureIndexQueue).filter(LiteratureIndexQueue.id.in_([q.id for q in queued])).delete(
+            synchronize_session=False
+        )
+        db.commit()
+    if docs:
+        # Meilisearch now reflects the edit, which may change results cached since the write.
+        search_cache.invalidate()
+    _mirror_to_shadow(docs)
+    with INDEX_LOCK:
+        INDEX_STATS["indexed"] += len(docs)
+        INDEX_STATS["batches"] += 1
+        INDEX_STATS["last_batch_size"] = len(docs)
+    return len(queued)
+
+def _mirror_to_shadow(docs: List[dict]):
+    """Keep a reindex shadow index current with live edits until it is swapped in."""
+    with REINDEX_LOCK:
+        shadow_uid = REINDEX_STATUS["shadow_uid"] if REINDEX_STATUS["state"] == "running" else None
+    if not docs or not shadow_uid:
+        return
+    try:
+        meili.index(shadow_uid).add_documents(docs)
+    except Exception:
+        # The consistency repair that follows the swap re-queues anything missed here.
+        logger.exception("Failed to mirror %d documents to shadow index %s", len(docs), shadow_uid)
+
+def _wait_for_meili(task):
+    result = meili.wait_for_task(task.task_uid, timeout_in_ms=REINDEX_TASK_TIMEOUT_MS)
+    if result.status != "succeeded":
+        raise RuntimeError(f"Meilisearch task {task.task_uid} {result.status}: {result.error}")
+
+def _stream_literature(db, batch_size: int = REINDEX_BATCH_SIZE):
+    """Yield batches of (id, title, content) rows in id order through a server-side cursor."""
+    result = db.execute(
+        select(Literature.id, Literature.title, Literature.content)
+        .order_by(Literature.id)
+        .execution_options(yield_per=batch_size)
+    )
+    yield from result.partitions()
+
+def _reindex_documents(rows) -> List[dict]:
+    docs = []
+    for row, content in zip(rows, crypto_pool.decrypt([row.content for row in rows])):
+        if content is None:
+            logger.error("Failed to decrypt literature %s for reindex", row.id)
+            continue
+        docs.append({"id": row.id, "title": row.title, "content": content, "stamp": _document_stamp(row)})
+    return docs
+
+def reindex_literature(batch_size: int = REINDEX_BATCH_SIZE) -> dict:
+    """Rebuild the search index into a shadow index, resuming from the last checkpoint, then swap it in."""
+    with SessionLocal() as db:
+        checkpoint = db.query(ReindexCheckpoint).order_by(ReindexCheckpoint.id.desc()).first()
+        if checkpoint is None:
+            checkpoint = ReindexCheckpoint(shadow_uid=f"literature_reindex_{int(time.time())}", last_id=0, indexed=0)
+            _wait_for_meili(meili.create_index(checkpoint.shadow_uid, {"primaryKey": "id"}))
+            db.add(checkpoint)
+            db.commit()
+        else:
+            logger.info("Resuming reindex into %s after id %s", checkpoint.shadow_uid, checkpoint.last_id)
+        with REINDEX_LOCK:
+            REINDEX_STATUS.update(
+                state="running", error=None,
+                shadow_uid=checkpoint.shadow_uid, last_id=checkpoint.last_id, indexed=checkpoint.indexed,
+            )
+        shadow = meili.index(checkpoint.shadow_uid)
+        # Keyset batches keep each read short, so no transaction stays open across Meilisearch waits.
+        while True:
+            rows = db.execute(
+                select(Literature.id, Literature.title, Literature.content)
+                .where(Literature.id > checkpoint.last_id)
+                .order_by(Literature.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            docs = _reindex_documents(rows)
+            if docs:
+                _wait_for_meili(shadow.add_documents(docs))
+                _index_locally(docs)
+            checkpoint.last_id = rows[-1].id
+            checkpoint.indexed += len(docs)
+            checkpoint.updated_at = datetime.utcnow()
+            db.commit()
+            with REINDEX_LOCK:
+                REINDEX_STATUS.update(last_id=checkpoint.last_id, indexed=checkpoint.indexed)
+        shadow_uid, indexed = checkpoint.shadow_uid, checkpoint.indexed
+        _wait_for_meili(meili.swap_indexes([{"indexes": ["literature", shadow_uid]}]))
+        search_cache.invalidate()
+        with REINDEX_LOCK:
+            REINDEX_STATUS.update(state="swapping", shadow_uid=None)
+        db.delete(checkpoint)
+        db.commit()
+    # After the swap the shadow uid holds the previous live documents.
+    try:
+        meili.delete_index(shadow_uid)
+    except Exception:
+        logger.exception("Failed to delete retired index %s", shadow_uid)
+    # Rows edited while a batch was in flight may have been overwritten with older content.
+    report = check_index_consistency(repair=True)
+    with REINDEX_LOCK:
+        REINDEX_STATUS.update(state="completed")
+    return {"indexed": indexed, "consistency": report}
+
+def _run_reindex():
+    try:
+        reindex_literature()
+    except Exception as exc:
+        logger.exception("Literature reindex failed")
+        with REINDEX_LOCK:
+            REINDEX_STATUS.update(state="failed", error=str(exc))
+
+def check_index_consistency(repair: bool = False, sample_size: int = 20) -> dict:
+    """Compare ids and stamps between the database and the live index; optionally re-queue/delete drift."""
+    index = meili.index('literature')
+    indexed = {}
+    offset = 0
+    while True:
+        page = index.get_documents({"fields": "id,stamp", "limit": CONSISTENCY_PAGE_SIZE, "offset": offset})
+        for doc in page.results:
+            doc = dict(doc)
+            indexed[int(doc["id"])] = doc.get("stamp")
+        if len(page.results) < CONSISTENCY_PAGE_SIZE:
+            break
+        offset += len(page.results)
+
+    missing, stale, checked = [], [], 0
+    with SessionLocal() as db:
+        for rows in _stream_literature(db):
+            for row in rows:
+                checked += 1
+                if row.id not in indexed:
+                    missing.append(row.id)
+                elif indexed.pop(row.id) != _document_stamp(row):
+                    stale.append(row.id)
+        extra = sorted(indexed)
+        if repair and (missing or stale):
+            db.execute(insert(LiteratureIndexQueue), [{"literature_id": i} for i in missing + stale])
+            db.commit()
+    if repair and extra:
+        index.delete_documents(extra)
+        search_cache.invalidate()
+    return {
+        "checked": checked,
+        "consistent": not (missing or stale or extra),
+        "missing": len(missing),
+        "stale": len(stale),
+        "extra": len(extra),
+        "sample": {"missing": missing[:sample_size], "stale": stale[:sample_size], "extra": extra[:sample_size]},
+        "repaired": repair,
+    }
+
+@app.post("/admin/reindex", status_code=202)
+def start_reindex():
+    global REINDEX_THREAD
+    with REINDEX_LOCK:
+        if REINDEX_THREAD and REINDEX_THREAD.is_alive():
+            raise HTTPException(status_code=409, detail="Reindex already running")
+        REINDEX_STATUS.update(state="starting", error=None)
+        REINDEX_THREAD = threading.Thread(target=_run_reindex, daemon=True)
+        REINDEX_THREAD.start()
+    return reindex_status()
+
+@app.get("/admin/reindex")
+def reindex_status():
+    with REINDEX_LOCK:
+        return dict(REINDEX_STATUS)
+
+@app.get("/admin/index/consistency")
+def index_consistency():
+    try:
+        return check_index_consistency()
+    except Exception:
+        logger.exception("Index consistency check failed")
+        raise HTTPException(status_code=500, detail="Consistency check failed")
+
+@app.post("/admin/index/repair")
+def repair_index():
+    try:
+        return check_index_consistency(repair=True)
+    except Exception:
+        logger.exception("Index repair failed")
+        raise HTTPException(status_code=500, detail="Index repair failed")
+
+def run_index_worker(stop_event: threading.Event):
+    logger.info("Starting literature index worker")
+    while not stop_event.wait(INDEX_FLUSH_INTERVAL):
+        try:
+            while drain_index_queue() >= INDEX_BATCH_SIZE and not stop_event.is_set():
+                pass
+        except Exception:
+            logger.exception("Literature index worker iteration failed")
+    logger.info("Literature index worker stopped")
+
+@app.get("/metrics")
+def metrics():
+    with SessionLocal() as db:
+        depth = db.query(func.count(LiteratureIndexQueue.id)).scalar()
+        oldest = db.query(func.min(LiteratureIndexQueue.enqueued_at)).scalar()
+    with INDEX_LOCK:
+        index_metrics = dict(INDEX_STATS)
+    index_metrics["queue_depth"] = depth
+    index_metrics["lag_seconds"] = (datetime.utcnow() - oldest).total_seconds() if oldest else 0.0
+    with SEARCH_LOCK:
+        search_metrics = {
+            "fallbacks": SEARCH_STATE["fallbacks"],
+            "meili_down": time.monotonic() < SEARCH_STATE["meili_down_until"],
+        }
+    search_metrics["meili_latency"] = MEILI_SEARCH_LATENCY.snapshot()
+    search_metrics["local_latency"] = LOCAL_SEARCH_LATENCY.snapshot()
+    search_metrics["local_documents"] = local_index.count()
+    search_metrics["cache"] = search_cache.snapshot()
+    return {
+        "index": index_metrics,
+        "search": search_metrics,
+        "content_cache": content_cache.snapshot(),
+        "graph_cache": graph_cache.snapshot(),
+    }
 
 @app.get("/health")
 def health():
@@ -226,3 +1302,25 @@ def ensure_meili_index():
             logger.info("Created Meilisearch index 'literature'")
     except Exception:
         logger.exception("Failed to ensure Meilisearch index exists")
+
+@app.on_event("startup")
+def start_index_worker():
+    if DISABLE_INDEX_WORKER:
+        logger.info("Index worker disabled via DISABLE_INDEX_WORKER")
+        return
+    global INDEX_THREAD
+    if INDEX_THREAD and INDEX_THREAD.is_alive():
+        return
+    INDEX_STOP_EVENT.clear()
+    INDEX_THREAD = threading.Thread(target=run_index_worker, args=(INDEX_STOP_EVENT,), daemon=True)
+    INDEX_THREAD.start()
+
+@app.on_event("shutdown")
+def stop_index_worker():
+    INDEX_STOP_EVENT.set()
+    if INDEX_THREAD:
+        INDEX_THREAD.join(timeout=2)
+
+@app.on_event("shutdown")
+def stop_crypto_pool():
+    crypto_pool.shutdown()
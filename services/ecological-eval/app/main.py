@@ -1,9 +1,11 @@
 import base64
 import json
 import logging
+import math
 import os
 import threading
-from datetime import datetime
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional
 
 import requests
@@ -12,14 +14,35 @@ from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric import padding, rsa
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from kafka import KafkaConsumer
 from pydantic import BaseModel, Field
-from sqlalchemy import Column, DateTime, Float, Integer, String, Text, create_engine
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    case,
+    create_engine,
+    delete,
+    insert,
+    or_,
+    select,
+    tuple_,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+from shared.cryptopool import CryptoPool
+from shared.schema import create_schema
+
 app = FastAPI(title="Ecological Evaluation Service")
 templates = Jinja2Templates(directory="templates")
 
@@ -43,8 +66,34 @@ class EcoData(Base):
     value = Column(Float)
     map_data = Column(Text)  # JSON for mapping info
     timestamp = Column(DateTime, default=datetime.utcnow)
+    # Every listing filters down to a prefix of one of these and then walks (timestamp, id) in order.
+    __table_args__ = (
+        Index("ix_eco_data_location_metric_ts", "location", "metric", "timestamp", "id"),
+        Index("ix_eco_data_metric_ts", "metric", "timestamp", "id"),
+        Index("ix_eco_data_ts", "timestamp", "id"),
+    )
+
+class EcoGeocell(Base):
+    """Coarse geohash cell per located reading, so spatial prefilters never need the encrypted coordinates."""
+    __tablename__ = "eco_geocells"
+    eco_id = Column(Integer, ForeignKey("eco_data.id"), primary_key=True)
+    cell = Column(String, nullable=False, index=True)
 
-Base.metadata.create_all(bind=engine)
+class EcoRollup(Base):
+    """Running count/sum/min/max/last per (location, metric) and hour, day or month bucket."""
+    __tablename__ = "eco_rollups"
+    granularity = Column(String, primary_key=True)
+    metric = Column(String, primary_key=True)
+    location = Column(String, primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    value_count = Column(Integer, nullable=False)
+    value_sum = Column(Float, nullable=False)
+    value_min = Column(Float, nullable=False)
+    value_max = Column(Float, nullable=False)
+    last_value = Column(Float, nullable=False)
+    last_at = Column(DateTime, nullable=False)
+
+create_schema(Base.metadata, engine)
 
 class EcoCreate(BaseModel):
     location: str = Field(..., min_length=1)
@@ -102,6 +151,23 @@ private_key = load_signing_key()
 public_key = private_key.public_key()
 
 EXPORT_TIMEOUT = int(os.getenv("EXPORT_TIMEOUT_SECONDS", "5"))
+ECO_PAGE_DEFAULT = int(os.getenv("ECO_PAGE_DEFAULT", "1000"))
+ECO_PAGE_MAX = int(os.getenv("ECO_PAGE_MAX", "10000"))
+MAP_CACHE_SIZE = int(os.getenv("MAP_CACHE_SIZE", "200000"))
+DECRYPT_PROCESSES = int(os.getenv("DECRYPT_PROCESSES", str(os.cpu_count() or 2)))
+DECRYPT_PARALLEL_MIN = int(os.getenv("DECRYPT_PARALLEL_MIN", "2000"))
+DECRYPT_CHUNK_SIZE = int(os.getenv("DECRYPT_CHUNK_SIZE", "1000"))
+# Precision 5 is ~4.9 km square: enough to prune, too coarse to locate a site.
+GEOHASH_PRECISION = int(os.getenv("GEOHASH_PRECISION", "5"))
+GEOHASH_MAX_CELLS = int(os.getenv("GEOHASH_MAX_CELLS", "256"))
+SPATIAL_MAX_POINTS = int(os.getenv("SPATIAL_MAX_POINTS", "2000000"))
+SPATIAL_REBUILD_THRESHOLD = int(os.getenv("SPATIAL_REBUILD_THRESHOLD", "4096"))
+SPATIAL_MAX_CANDIDATES = int(os.getenv("SPATIAL_MAX_CANDIDATES", "100000"))
+CLUSTER_MAX_ZOOM = int(os.getenv("CLUSTER_MAX_ZOOM", "12"))
+CLUSTER_CELL_PX = 64  # power of two, so cells at every zoom come from one pixel computation by shifting
+SERIES_MAX_POINTS = int(os.getenv("SERIES_MAX_POINTS", "500"))
+ROLLUP_REBUILD_BATCH = int(os.getenv("ROLLUP_REBUILD_BATCH", "5000"))
+DISABLE_SPATIAL_WARMUP = os.getenv("DISABLE_SPATIAL_WARMUP", "false").lower() == "true"
 ECO_TOPIC = os.getenv("REDPANDA_TOPIC_ECO", "eco_topic")
 DISABLE_KAFKA_CONSUMER = os.getenv("DISABLE_KAFKA_CONSUMER", "false").lower() == "true"
 CONSUMER_STOP_EVENT = threading.Event()
@@ -143,6 +209,7 @@ def _send_exports(payload: Dict[str, object]) -> None:
 def create_eco_data(item: EcoCreate):
     map_json = json.dumps(item.map_coords)
     encrypted_map = cipher.encrypt(map_json.encode())
+    located = _lat_lon(item.map_coords)
     with SessionLocal() as db:
         data = EcoData(
             location=item.location,
@@ -152,43 +219,743 @@ def create_eco_data(item: EcoCreate):
         )
         try:
             db.add(data)
+            db.flush()
+            if located:
+                db.add(EcoGeocell(eco_id=data.id, cell=geohash(*located, GEOHASH_PRECISION)))
+            record_rollups(db, data)
             db.commit()
             db.refresh(data)
         except Exception:
             db.rollback()
             logger.exception("Failed to persist eco_data record")
             raise HTTPException(status_code=500, detail="Failed to save data")
+    map_decryptor.remember(data.id, item.map_coords)
+    spatial_index.add(data.id, item.map_coords, item.metric, item.value)
     bundle = {"data": _serialize_eco_row(data, item.map_coords), "timestamp": datetime.utcnow().isoformat()}
     _send_exports(bundle)
     return _serialize_eco_row(data, item.map_coords)
 
-@app.get("/eco-data/map", response_model=List[EcoItem])
-def get_map_data():
+class MapDecryptor:
+    """Decrypts map_data with an LRU of results by row id (rows are immutable after insert).
+
+    Cache misses are decrypted and parsed through a shared CryptoPool, which fans large batches out to
+    worker processes.
+    """
+
+    def __init__(self, pool: CryptoPool, cache_size: int):
+        self.pool = pool
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[int, Dict[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def remember(self, row_id: int, decrypted: Dict[str, float]) -> None:
+        with self._lock:
+            self._store(row_id, decrypted)
+
+    def decrypt(self, rows) -> List[Dict[str, float]]:
+        results: List[Optional[Dict[str, float]]] = [None] * len(rows)
+        missing = []
+        with self._lock:
+            for n, row in enumerate(rows):
+                cached = self._cache.get(row.id)
+                if cached is None:
+                    missing.append(n)
+                else:
+                    self._cache.move_to_end(row.id)
+                    results[n] = cached
+            self.stats["hits"] += len(rows) - len(missing)
+            self.stats["misses"] += len(missing)
+        # Rows from the Kafka consumer carry no coordinates and are never cached.
+        located = [n for n in missing if rows[n].map_data]
+        for n in missing:
+            results[n] = {}
+        decrypted = self.pool.decrypt([rows[n].map_data for n in located], parse=json.loads)
+        with self._lock:
+            for n, value in zip(located, decrypted):
+                if value is None:
+                    logger.warning("Failed to decrypt map for eco_data id=%s", rows[n].id)
+                    value = {}
+                results[n] = value
+                self._store(rows[n].id, value)
+        return results
+
+    def _store(self, row_id: int, decrypted: Dict[str, float]) -> None:
+        if self.cache_size <= 0:
+            return
+        self._cache[row_id] = decrypted
+        self._cache.move_to_end(row_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return dict(
+                self.stats,
+                parallel_batches=self.pool.parallel_batches,
+                size=len(self._cache),
+                hit_rate=round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+            )
+
+    def shutdown(self) -> None:
+        self.pool.shutdown()
+
+map_decryptor = MapDecryptor(
+    CryptoPool(os.environ["ENCRYPTION_KEY"].encode(), DECRYPT_PROCESSES, DECRYPT_PARALLEL_MIN, DECRYPT_CHUNK_SIZE),
+    MAP_CACHE_SIZE,
+)
+
+GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+def geohash(lat: float, lon: float, precision: int) -> str:
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, value, bits, use_lon = [], 0, 0, True
+    while len(chars) < precision:
+        span, coord = (lon_range, lon) if use_lon else (lat_range, lat)
+        mid = (span[0] + span[1]) / 2
+        if coord >= mid:
+            value, span[0] = value * 2 + 1, mid
+        else:
+            value, span[1] = value * 2, mid
+        use_lon, bits = not use_lon, bits + 1
+        if bits == 5:
+            chars.append(GEOHASH_BASE32[value])
+            value, bits = 0, 0
+    return "".join(chars)
+
+def geohash_cover(bbox: tuple, precision: int, max_cells: int):
+    """Cells covering bbox at the finest precision <= `precision` needing at most max_cells; (0, []) = world."""
+    min_lon, min_lat, max_lon, max_lat = bbox
+    for level in range(precision, 0, -1):
+        lon_cells, lat_cells = 2 ** ((5 * level + 1) // 2), 2 ** (5 * level // 2)
+        dlon, dlat = 360.0 / lon_cells, 180.0 / lat_cells
+        x0, x1 = (min(int((v + 180) / dlon), lon_cells - 1) for v in (min_lon, max_lon))
+        y0, y1 = (min(int((v + 90) / dlat), lat_cells - 1) for v in (min_lat, max_lat))
+        if (x1 - x0 + 1) * (y1 - y0 + 1) <= max_cells:
+            return level, sorted({
+                geohash((y + 0.5) * dlat - 90, (x + 0.5) * dlon - 180, level)
+                for x in range(x0, x1 + 1)
+                for y in range(y0, y1 + 1)
+            })
+    return 0, []
+
+def _lat_lon(decrypted_map: Dict[str, float]) -> Optional[tuple]:
+    lat, lon = decrypted_map.get("lat"), decrypted_map.get("lon")
+    if isinstance(lat, (int, float)) and isinstance(lon, (int, float)):
+        return float(lat), float(lon)
+    return None
+
+def web_mercator_pixel(lat: float, lon: float, zoom: int) -> tuple:
+    """Global pixel coordinates of a point on 256px web-mercator tiles at `zoom`."""
+    scale = 256 * 2 ** zoom
+    sin_lat = math.sin(math.radians(max(min(lat, 85.0511), -85.0511)))
+    y = (0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)) * scale
+    return int((lon + 180) / 360 * scale), int(y)
+
+class PointRTree:
+    """Static Sort-Tile-Recursive packed R-tree over (lon, lat, id) points; nodes are plain tuples."""
+
+    def __init__(self, points: List[tuple], node_size: int = 16):
+        self.node_size = node_size
+        level = [self._node(group, True) for group in self._tiles(points, lambda p: p[0], lambda p: p[1])]
+        while len(level) > 1:
+            level = [
+                self._node(group, False)
+                for group in self._tiles(level, lambda n: n[0] + n[2], lambda n: n[1] + n[3])
+            ]
+        self.root = level[0] if level else None
+
+    def _tiles(self, items: list, key_x, key_y):
+        slices = math.ceil(math.sqrt(math.ceil(len(items) / self.node_size)))
+        items = sorted(items, key=key_x)
+        per_slice = slices * self.node_size
+        for start in range(0, len(items), per_slice):
+            strip = sorted(items[start:start + per_slice], key=key_y)
+            for offset in range(0, len(strip), self.node_size):
+                yield strip[offset:offset + self.node_size]
+
+    @staticmethod
+    def _node(children: list, leaf: bool) -> tuple:
+        if leaf:
+            xs, ys = [p[0] for p in children], [p[1] for p in children]
+            return (min(xs), min(ys), max(xs), max(ys), True, children)
+        return (
+            min(c[0] for c in children), min(c[1] for c in children),
+            max(c[2] for c in children), max(c[3] for c in children), False, children,
+        )
+
+    def query(self, min_lon: float, min_lat: float, max_lon: float, max_lat: float) -> List[int]:
+        found, stack = [], [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            if node[0] > max_lon or node[2] < min_lon or node[1] > max_lat or node[3] < min_lat:
+                continue
+            if node[4]:
+                found.extend(p[2] for p in node[5] if min_lon <= p[0] <= max_lon and min_lat <= p[1] <= max_lat)
+            else:
+                stack.extend(node[5])
+        return found
+
+class ClusterGrid:
+    """Per-zoom grid of marker clusters (count, centroid, per-metric count/sum/min/max), updated per point.
+
+    A point's cell at every zoom derives from its pixel at max_zoom by a right shift, so an insert
+    costs max_zoom + 1 dictionary updates.
+    """
+
+    def __init__(self, max_zoom: int, cell_px: int):
+        self.max_zoom = max_zoom
+        self.cell_shift = cell_px.bit_length() - 1
+        self.levels: List[Dict[tuple, list]] = [{} for _ in range(max_zoom + 1)]
+
+    def add(self, lat: float, lon: float, metric: Optional[str], value: Optional[float]) -> None:
+        px, py = web_mercator_pixel(lat, lon, self.max_zoom)
+        for zoom, cells in enumerate(self.levels):
+            shift = self.max_zoom - zoom + self.cell_shift
+            key = (px >> shift, py >> shift)
+            cell = cells.get(key)
+            if cell is None:
+                cell = cells[key] = [0, 0.0, 0.0, {}]
+            cell[0] += 1
+            cell[1] += lat
+            cell[2] += lon
+            if value is None:
+                continue
+            summary = cell[3].get(metric)
+            if summary is None:
+                cell[3][metric] = [1, value, value, value]
+            else:
+                summary[0] += 1
+                summary[1] += value
+                summary[2] = min(summary[2], value)
+                summary[3] = max(summary[3], value)
+
+    def tile(self, z: int, x: int, y: int) -> List[Dict[str, object]]:
+        per_tile = 256 >> self.cell_shift
+        cells = self.levels[z]
+        clusters = []
+        for cx in range(x * per_tile, (x + 1) * per_tile):
+            for cy in range(y * per_tile, (y + 1) * per_tile):
+                cell = cells.get((cx, cy))
+                if cell is None:
+                    continue
+                count, lat_sum, lon_sum, metrics = cell
+                clusters.append({
+                    "count": count,
+                    "lat": lat_sum / count,
+                    "lon": lon_sum / count,
+                    "metrics": {
+                        name: {"count": m[0], "mean": m[1] / m[0], "min": m[2], "max": m[3]}
+                        for name, m in metrics.items()
+                    },
+                })
+        return clusters
+
+    def size(self) -> int:
+        return sum(len(cells) for cells in self.levels)
+
+class SpatialIndex:
+    """In-memory R-tree and cluster grid over decrypted points, built once from the table and topped up on insert.
+
+    New points go to a small pending list that queries scan linearly until a background rebuild folds
+    it in; clusters are updated in place. If the table has more than max_points located rows neither is
+    built and callers fall back to geohash cells.
+    """
+
+    def __init__(self, max_points: int, rebuild_threshold: int):
+        self.max_points = max_points
+        self.rebuild_threshold = rebuild_threshold
+        self.ready = False
+        self.disabled = False
+        self._points: List[tuple] = []
+        self._pending: List[tuple] = []
+        self._tree: Optional[PointRTree] = None
+        self._clusters: Optional[ClusterGrid] = None
+        self._rebuilding = False
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def add(self, row_id: int, decrypted_map: Dict[str, float], metric: Optional[str] = None, value: Optional[float] = None) -> None:
+        located = _lat_lon(decrypted_map)
+        if located:
+            with self._lock:
+                self._pending.append((located[1], located[0], row_id, metric, value))
+                # Before the build, the pending entry is merged into the clusters with the table scan.
+                if self.ready:
+                    self._clusters.add(*located, metric, value)
+
+    def tile(self, z: int, x: int, y: int) -> Optional[List[Dict[str, object]]]:
+        with self._lock:
+            return self._clusters.tile(z, x, y) if self.ready else None
+
+    def cluster_cells(self) -> int:
+        with self._lock:
+            return self._clusters.size() if self.ready else 0
+
+    def query(self, bbox: tuple) -> Optional[List[int]]:
+        with self._lock:
+            if not self.ready:
+                return None
+            if len(self._pending) > self.rebuild_threshold and not self._rebuilding:
+                self._rebuilding = True
+                threading.Thread(target=self._rebuild, daemon=True).start()
+            min_lon, min_lat, max_lon, max_lat = bbox
+            found = self._tree.query(*bbox)
+            found.extend(
+                p[2] for p in self._pending if min_lon <= p[0] <= max_lon and min_lat <= p[1] <= max_lat
+            )
+            return found
+
+    def _rebuild(self) -> None:
+        """Fold pending points into a new tree built off the lock; queries scan the pending list meanwhile."""
+        try:
+            with self._lock:
+                base, folded = self._points, list(self._pending)
+            points = base + [p[:3] for p in folded]
+            tree = PointRTree(points)
+            with self._lock:
+                self._points = points
+                self._pending = self._pending[len(folded):]
+                self._tree = tree
+        except Exception:
+            logger.exception("Failed to rebuild spatial index")
+        finally:
+            with self._lock:
+                self._rebuilding = False
+
+    def ensure_built(self) -> None:
+        with self._build_lock:
+            if self.ready or self.disabled:
+                return
+            # The geohash fallback is the only spatial path when the tree is disabled, so this runs regardless.
+            backfill_geocells()
+            points = []
+            clusters = ClusterGrid(CLUSTER_MAX_ZOOM, CLUSTER_CELL_PX)
+            with SessionLocal() as db:
+                result = db.execute(
+                    select(EcoData.id, EcoData.map_data, EcoData.metric, EcoData.value)
+                    .where(EcoData.map_data.isnot(None))
+                    .execution_options(yield_per=DECRYPT_CHUNK_SIZE * max(DECRYPT_PROCESSES, 1))
+                )
+                for rows in result.partitions():
+                    for row, decrypted_map in zip(rows, map_decryptor.decrypt(rows)):
+                        located = _lat_lon(decrypted_map)
+                        if not located:
+                            continue
+                        points.append((located[1], located[0], row.id))
+                        clusters.add(*located, row.metric, row.value)
+                    if len(points) > self.max_points:
+                        logger.warning("More than %d located rows; spatial queries use geohash cells only", self.max_points)
+                        self.disabled = True
+                        return
+            with self._lock:
+                known = {p[2] for p in points}
+                for lon, lat, row_id, metric, value in self._pending:
+                    if row_id not in known:
+                        points.append((lon, lat, row_id))
+                        clusters.add(lat, lon, metric, value)
+                self._pending = []
+                self._points = points
+                self._tree = PointRTree(points)
+                self._clusters = clusters
+                self.ready = True
+            logger.info("Spatial index built over %d points", len(points))
+
+def backfill_geocells() -> int:
+    """Add eco_geocells for located rows that predate them, in keyset batches; returns the number added."""
+    added, last_id = 0, 0
+    batch = DECRYPT_CHUNK_SIZE * max(DECRYPT_PROCESSES, 1)
+    while True:
+        with SessionLocal() as db:
+            rows = db.execute(
+                select(EcoData.id, EcoData.map_data)
+                .outerjoin(EcoGeocell, EcoGeocell.eco_id == EcoData.id)
+                .where(EcoData.map_data.isnot(None), EcoGeocell.eco_id.is_(None), EcoData.id > last_id)
+                .order_by(EcoData.id)
+                .limit(batch)
+            ).all()
+            if not rows:
+                break
+            cells = []
+            for row, decrypted_map in zip(rows, map_decryptor.decrypt(rows)):
+                located = _lat_lon(decrypted_map)
+                if located:
+                    cells.append({"eco_id": row.id, "cell": geohash(*located, GEOHASH_PRECISION)})
+            if cells:
+                db.execute(insert(EcoGeocell), cells)
+                db.commit()
+            added += len(cells)
+            last_id = rows[-1].id
+    if added:
+        logger.info("Backfilled geohash cells for %d eco_data rows", added)
+    return added
+
+spatial_index = SpatialIndex(SPATIAL_MAX_POINTS, SPATIAL_REBUILD_THRESHOLD)
+
+def _utc_naive(value: datetime) -> datetime:
+    """Timestamps are stored as naive UTC; aware query bounds are converted to match."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def _eco_query(
+    location: Optional[str],
+    metric: Optional[str],
+    since: Optional[datetime],
+    until: Optional[datetime],
+    after: Optional[str],
+):
+    query = select(EcoData.id, EcoData.location, EcoData.metric, EcoData.value, EcoData.map_data, EcoData.timestamp)
+    if location:
+        query = query.where(EcoData.location == location)
+    if metric:
+        query = query.where(EcoData.metric == metric)
+    if since:
+        query = query.where(EcoData.timestamp >= _utc_naive(since))
+    if until:
+        query = query.where(EcoData.timestamp < _utc_naive(until))
+    if after:
+        try:
+            stamp, row_id = after.rsplit(",", 1)
+            cursor = (_utc_naive(datetime.fromisoformat(stamp)), int(row_id))
+        except ValueError:
+            raise HTTPException(status_code=422, detail="Invalid cursor")
+        query = query.where(tuple_(EcoData.timestamp, EcoData.id) > tuple_(*cursor))
+    return query
+
+def _check_limit(limit: int) -> None:
+    if not 1 <= limit <= ECO_PAGE_MAX:
+        raise HTTPException(status_code=422, detail=f"limit must be between 1 and {ECO_PAGE_MAX}")
+
+def _eco_page(
+    location: Optional[str],
+    metric: Optional[str],
+    since: Optional[datetime],
+    until: Optional[datetime],
+    limit: int,
+    after: Optional[str],
+):
+    """One keyset page in (timestamp, id) order; returns (rows, cursor for the next page or None)."""
+    _check_limit(limit)
+    query = _eco_query(location, metric, since, until, after)
     with SessionLocal() as db:
-        data = db.query(EcoData).all()
-    decrypted = []
-    for d in data:
-        decrypted_map = cipher.decrypt(d.map_data.encode()).decode()
-        decrypted.append(_serialize_eco_row(d, json.loads(decrypted_map)))
-    return decrypted
+        rows = db.execute(query.order_by(EcoData.timestamp, EcoData.id).limit(limit + 1)).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, f"{rows[-1].timestamp.isoformat()},{rows[-1].id}"
+    return rows, None
+
+def _parse_bbox(bbox: str) -> tuple:
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(v) for v in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=422, detail="bbox must be min_lon,min_lat,max_lon,max_lat")
+    if not all(math.isfinite(v) for v in (min_lon, min_lat, max_lon, max_lat)):
+        raise HTTPException(status_code=422, detail="bbox values must be finite numbers")
+    if min_lon > max_lon or min_lat > max_lat:
+        raise HTTPException(status_code=422, detail="bbox minimums must not exceed maximums")
+    # Map clients report world-copy longitudes (e.g. 190) after panning across the antimeridian.
+    if max_lon - min_lon >= 360:
+        min_lon, max_lon = -180.0, 180.0
+    else:
+        shift = math.floor((min_lon + 180) / 360) * 360
+        min_lon, max_lon = min_lon - shift, max_lon - shift
+        if max_lon > 180:
+            raise HTTPException(status_code=422, detail="bbox crosses the antimeridian; split it at 180")
+    return min_lon, max(min_lat, -90.0), max_lon, min(max_lat, 90.0)
 
-@app.get("/eco-data", response_model=List[EcoItem])
-def get_eco_data():
+def _spatial_candidates(bbox: tuple) -> List[int]:
+    """Ids of rows that may fall inside bbox: exact from the R-tree, or a geohash-cell superset."""
+    ids = spatial_index.query(bbox)
+    if ids is not None:
+        return ids
+    level, cells = geohash_cover(bbox, GEOHASH_PRECISION, GEOHASH_MAX_CELLS)
+    query = select(EcoGeocell.eco_id)
+    if level == GEOHASH_PRECISION:
+        query = query.where(EcoGeocell.cell.in_(cells))
+    elif cells:
+        query = query.where(or_(*[EcoGeocell.cell.startswith(cell) for cell in cells]))
     with SessionLocal() as db:
-        rows = db.query(EcoData).all()
-    payload = []
+        return db.execute(query).scalars().all()
+
+def _bbox_page(bbox: tuple, zoom: Optional[int], location, metric, since, until, limit: int, after):
+    """Like _eco_page but limited to points inside bbox; with zoom, keeps one point per screen pixel."""
+    _check_limit(limit)
+    ids = sorted(_spatial_candidates(bbox))
+    if len(ids) > SPATIAL_MAX_CANDIDATES:
+        raise HTTPException(status_code=422, detail="bbox holds too many points; zoom in or add filters")
+    rows = []
+    with SessionLocal() as db:
+        for start in range(0, len(ids), 1000):
+            query = _eco_query(location, metric, since, until, after).where(EcoData.id.in_(ids[start:start + 1000]))
+            rows.extend(db.execute(query).all())
+    rows.sort(key=lambda r: (r.timestamp, r.id))
+    min_lon, min_lat, max_lon, max_lat = bbox
+    kept, pixels = [], set()
+    # Decrypt in page-sized slices so a large candidate set is only decrypted as far as needed.
+    step = max(limit + 1, DECRYPT_CHUNK_SIZE)
+    for start in range(0, len(rows), step):
+        window = rows[start:start + step]
+        for row, decrypted_map in zip(window, map_decryptor.decrypt(window)):
+            located = _lat_lon(decrypted_map)
+            if not located or not (min_lat <= located[0] <= max_lat and min_lon <= located[1] <= max_lon):
+                continue
+            if zoom is not None:
+                pixel = web_mercator_pixel(*located, zoom)
+                if pixel in pixels:
+                    continue
+                pixels.add(pixel)
+            kept.append((row, decrypted_map))
+            if len(kept) > limit:
+                last = kept[limit - 1][0]
+                return kept[:limit], f"{last.timestamp.isoformat()},{last.id}"
+    return kept, None
+
+def _stream_eco(rows, maps, fmt: str, next_cursor: Optional[str]) -> StreamingResponse:
+    """Serialize rows as they are written; the next-page cursor travels in the X-Next-Cursor header."""
+    def encode(row, decrypted_map):
+        item = _serialize_eco_row(row, decrypted_map)
+        item["timestamp"] = row.timestamp.isoformat() if row.timestamp else None
+        return json.dumps(item)
+
+    def as_json():
+        yield "["
+        for n, (row, decrypted_map) in enumerate(zip(rows, maps)):
+            yield ("," if n else "") + encode(row, decrypted_map)
+        yield "]"
+
+    def as_ndjson():
+        for row, decrypted_map in zip(rows, maps):
+            yield encode(row, decrypted_map) + "\n"
+
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    if fmt == "ndjson":
+        return StreamingResponse(as_ndjson(), media_type="application/x-ndjson", headers=headers)
+    return StreamingResponse(as_json(), media_type="application/json", headers=headers)
+
+@app.get("/eco-data/map")
+def get_map_data(
+    location: Optional[str] = None,
+    metric: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = ECO_PAGE_DEFAULT,
+    after: Optional[str] = None,
+    format: str = "json",
+    bbox: Optional[str] = None,
+    zoom: Optional[int] = None,
+):
+    """Map points; `bbox=min_lon,min_lat,max_lon,max_lat` limits them to a viewport via the spatial index."""
+    if bbox:
+        kept, next_cursor = _bbox_page(_parse_bbox(bbox), zoom, location, metric, since, until, limit, after)
+        return _stream_eco([row for row, _ in kept], [m for _, m in kept], format, next_cursor)
+    rows, next_cursor = _eco_page(location, metric, since, until, limit, after)
+    return _stream_eco(rows, map_decryptor.decrypt(rows), format, next_cursor)
+
+@app.get("/eco-data/tiles/{z}/{x}/{y}")
+def get_cluster_tile(z: int, x: int, y: int):
+    """Marker clusters in one 256px web-mercator tile; zoom past CLUSTER_MAX_ZOOM with /eco-data/map?bbox."""
+    if not 0 <= z <= CLUSTER_MAX_ZOOM:
+        raise HTTPException(status_code=422, detail=f"z must be between 0 and {CLUSTER_MAX_ZOOM}")
+    if not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=422, detail="Tile coordinates out of range")
+    clusters = spatial_index.tile(z, x, y)
+    if clusters is None and spatial_index.disabled:
+        raise HTTPException(
+            status_code=501,
+            detail=f"Cluster tiles are disabled above {SPATIAL_MAX_POINTS} located rows; use /eco-data/map?bbox",
+        )
+    if clusters is None:
+        raise HTTPException(status_code=503, detail="Spatial index is not available yet", headers={"Retry-After": "5"})
+    return {"z": z, "x": x, "y": y, "clusters": clusters}
+
+@app.get("/eco-data")
+def get_eco_data(
+    location: Optional[str] = None,
+    metric: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = ECO_PAGE_DEFAULT,
+    after: Optional[str] = None,
+    format: str = "json",
+):
+    """Filtered page of readings; follow the X-Next-Cursor header (as `after`) for the rest."""
+    rows, next_cursor = _eco_page(location, metric, since, until, limit, after)
+    return _stream_eco(rows, map_decryptor.decrypt(rows), format, next_cursor)
+
+# Rollups: every reading lands in one hour, day and month bucket; coarser steps are merged from those.
+ROLLUP_GRANULARITIES = ("hour", "day", "month")
+SERIES_STEPS = {"hour": "hour", "day": "day", "week": "day", "month": "month", "quarter": "month", "year": "month"}
+STEP_SECONDS = {"hour": 3600, "day": 86400, "week": 604800, "month": 2629746, "quarter": 7889238, "year": 31556952}
+
+def bucket_start(at: datetime, step: str) -> datetime:
+    if step == "hour":
+        return at.replace(minute=0, second=0, microsecond=0)
+    day = at.replace(hour=0, minute=0, second=0, microsecond=0)
+    if step == "day":
+        return day
+    if step == "week":
+        return day - timedelta(days=day.weekday())
+    month = day.replace(day=1)
+    if step == "month":
+        return month
+    if step == "quarter":
+        return month.replace(month=(month.month - 1) // 3 * 3 + 1)
+    return month.replace(month=1)
+
+def record_rollups(db, row: EcoData) -> None:
+    """Fold one flushed reading into its buckets inside the caller's transaction."""
+    if row.value is None:
+        return
+    table = EcoRollup.__table__
+    dialect_insert = pg_insert if engine.dialect.name == "postgresql" else sqlite_insert
+    stmt = dialect_insert(table).values([
+        {
+            "granularity": granularity,
+            "metric": row.metric,
+            "location": row.location,
+            "bucket_start": bucket_start(row.timestamp, granularity),
+            "value_count": 1,
+            "value_sum": row.value,
+            "value_min": row.value,
+            "value_max": row.value,
+            "last_value": row.value,
+            "last_at": row.timestamp,
+        }
+        for granularity in ROLLUP_GRANULARITIES
+    ])
+    new = stmt.excluded
+    newer = new.last_at >= table.c.last_at
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.granularity, table.c.metric, table.c.location, table.c.bucket_start],
+        set_={
+            "value_count": table.c.value_count + new.value_count,
+            "value_sum": table.c.value_sum + new.value_sum,
+            "value_min": case((new.value_min < table.c.value_min, new.value_min), else_=table.c.value_min),
+            "value_max": case((new.value_max > table.c.value_max, new.value_max), else_=table.c.value_max),
+            "last_value": case((newer, new.last_value), else_=table.c.last_value),
+            "last_at": case((newer, new.last_at), else_=table.c.last_at),
+        },
+    ))
+
+def _merge_rollups(rows, step: str) -> List[Dict[str, object]]:
+    merged: "OrderedDict[datetime, list]" = OrderedDict()
     for row in rows:
+        key = bucket_start(row.bucket_start, step)
+        point = merged.get(key)
+        if point is None:
+            merged[key] = [row.value_count, row.value_sum, row.value_min, row.value_max, row.last_value, row.last_at]
+            continue
+        point[0] += row.value_count
+        point[1] += row.value_sum
+        point[2] = min(point[2], row.value_min)
+        point[3] = max(point[3], row.value_max)
+        if row.last_at >= point[5]:
+            point[4], point[5] = row.last_value, row.last_at
+    return [
+        {"t": key, "count": count, "sum": total, "mean": total / count, "min": low, "max": high, "last": last}
+        for key, (count, total, low, high, last, _) in merged.items()
+    ]
+
+@app.get("/eco-data/series")
+def get_series(
+    metric: str,
+    location: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    step: Optional[str] = None,
+    max_points: int = SERIES_MAX_POINTS,
+):
+    """Aggregated series from the rollups; without `step`, the finest one that fits in `max_points` is used.
+
+    Points cover whole buckets, so the first one may include readings from just before `since`.
+    """
+    until = _utc_naive(until) if until else datetime.utcnow()
+    since = _utc_naive(since) if since else until - timedelta(days=30)
+    if since >= until:
+        raise HTTPException(status_code=422, detail="since must be before until")
+    if step is None:
+        if max_points < 1:
+            raise HTTPException(status_code=422, detail="max_points must be positive")
+        span = (until - since).total_seconds()
+        step = next((name for name, seconds in STEP_SECONDS.items() if span / seconds <= max_points), "year")
+    elif step not in SERIES_STEPS:
+        raise HTTPException(status_code=422, detail=f"step must be one of {', '.join(SERIES_STEPS)}")
+    source = SERIES_STEPS[step]
+    query = select(EcoRollup).where(
+        EcoRollup.granularity == source,
+        EcoRollup.metric == metric,
+        EcoRollup.bucket_start >= bucket_start(since, step),
+        EcoRollup.bucket_start < until,
+    )
+    if location is not None:
+        query = query.where(EcoRollup.location == location)
+    with SessionLocal() as db:
+        rows = db.execute(query.order_by(EcoRollup.bucket_start)).scalars().all()
+    return {
+        "metric": metric,
+        "location": location,
+        "step": step,
+        "source": source,
+        "points": _merge_rollups(rows, step),
+    }
+
+@app.post("/admin/rollups/rebuild")
+def rebuild_rollups():
+    """Recompute every rollup from eco_data, e.g. once after upgrading; pause producers while it runs."""
+    buckets: Dict[tuple, list] = {}
+    readings = 0
+    with SessionLocal() as db:
         try:
-            decrypted_map = json.loads(cipher.decrypt(row.map_data.encode()).decode())
+            result = db.execute(
+                select(EcoData.location, EcoData.metric, EcoData.value, EcoData.timestamp)
+                .where(EcoData.value.is_not(None), EcoData.timestamp.is_not(None))
+                .order_by(EcoData.timestamp, EcoData.id)
+                .execution_options(yield_per=ROLLUP_REBUILD_BATCH)
+            )
+            for location, metric, value, at in result:
+                readings += 1
+                for granularity in ROLLUP_GRANULARITIES:
+                    key = (granularity, metric, location, bucket_start(at, granularity))
+                    bucket = buckets.get(key)
+                    if bucket is None:
+                        buckets[key] = [1, value, value, value, value, at]
+                        continue
+                    bucket[0] += 1
+                    bucket[1] += value
+                    bucket[2] = min(bucket[2], value)
+                    bucket[3] = max(bucket[3], value)
+                    bucket[4], bucket[5] = value, at  # rows arrive in timestamp order
+            db.execute(delete(EcoRollup))
+            values = [
+                {
+                    "granularity": granularity,
+                    "metric": metric,
+                    "location": location,
+                    "bucket_start": start,
+                    "value_count": count,
+                    "value_sum": total,
+                    "value_min": low,
+                    "value_max": high,
+                    "last_value": last,
+                    "last_at": last_at,
+                }
+                for (granularity, metric, location, start), (count, total, low, high, last, last_at) in buckets.items()
+            ]
+            for offset in range(0, len(values), ROLLUP_REBUILD_BATCH):
+                db.execute(insert(EcoRollup), values[offset:offset + ROLLUP_REBUILD_BATCH])
+            db.commit()
         except Exception:
-            logger.warning("Failed to decrypt map for eco_data id=%s", row.id)
-            decrypted_map = {}
-        payload.append(_serialize_eco_row(row, decrypted_map))
-    return payload
+            db.rollback()
+            logger.exception("Failed to rebuild eco rollups")
+            raise HTTPException(status_code=500, detail="Failed to rebuild rollups")
+    return {"status": "rebuilt", "readings": readings, "buckets": len(buckets)}
 
 @app.get("/dashboard", response_class=HTMLResponse)
 def dashboard(request: Request):
-    return templates.TemplateResponse("dashboard.html", {"request": request})
+    return templates.TemplateResponse("dashboard.html", {"request": request, "cluster_max_zoom": CLUSTER_MAX_ZOOM})
 
 # Consumer thread
 def consume_eco_topic(stop_event: threading.Event):
@@ -202,25 +969,28 @@ def consume_eco_topic(stop_event: threading.Event):
     try:
         while not stop_event.is_set():
             for message in consumer:
-                data = message.value
-                with SessionLocal() as db:
-                    eco = EcoData(
-                        location=data.get("location", "unknown"),
-                        metric=data.get("metric", "unknown"),
-                        value=data.get("value", 0.0),
-                    )
-                    try:
-                        db.add(eco)
-                        db.commit()
-                    except Exception:
-                        db.rollback()
-                        logger.exception("Failed to persist consumed eco data")
-                        continue
+                _persist_consumed(message.value)
             # Loop again to check stop flag after timeout
     finally:
         consumer.close()
         logger.info("Kafka consumer for '%s' stopped", ECO_TOPIC)
 
+def _persist_consumed(data: Dict[str, object]) -> None:
+    with SessionLocal() as db:
+        eco = EcoData(
+            location=data.get("location", "unknown"),
+            metric=data.get("metric", "unknown"),
+            value=data.get("value", 0.0),
+        )
+        try:
+            db.add(eco)
+            db.flush()
+            record_rollups(db, eco)
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.exception("Failed to persist consumed eco data")
+
 @app.on_event("startup")
 def start_consumer():
     if DISABLE_KAFKA_CONSUMER:
@@ -239,6 +1009,22 @@ def stop_consumer():
     if CONSUMER_THREAD:
         CONSUMER_THREAD.join(timeout=2)
 
+@app.on_event("startup")
+def warm_spatial_index():
+    if DISABLE_SPATIAL_WARMUP:
+        return
+    threading.Thread(target=_build_spatial_index, daemon=True).start()
+
+def _build_spatial_index():
+    try:
+        spatial_index.ensure_built()
+    except Exception:
+        logger.exception("Failed to build spatial index")
+
+@app.on_event("shutdown")
+def stop_decrypt_pool():
+    map_decryptor.shutdown()
+
 @app.post("/eco-data/congruence")
 def send_for_congruence():
     with SessionLocal() as db:
@@ -265,6 +1051,17 @@ def send_for_congruence():
     congruence_report = response.json()
     return {"status": "sent", "report": congruence_report}
 
+@app.get("/metrics")
+def metrics():
+    return {
+        "map_cache": map_decryptor.snapshot(),
+        "spatial_index": {
+            "ready": spatial_index.ready,
+            "disabled": spatial_index.disabled,
+            "cluster_cells": spatial_index.cluster_cells(),
+        },
+    }
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
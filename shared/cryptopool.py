@@ -0,0 +1,99 @@
+# Bulk Fernet work on a pool of spawned worker processes
+#
+# Fernet's AES and HMAC steps release the GIL, but its base64 framing and per-token Python work do not,
+# so threads barely overlap; large batches are split into chunks and sent to worker processes instead.
+# Workers are spawned rather than forked, since the services already run background threads and a
+# forked child could inherit one of their locks while held. Small batches stay in-process, where
+# pickling would cost more than it saves.
+#
+# Spawned workers import this module to unpickle the chunk functions, so it must stay free of
+# import-time side effects: nothing here may touch a database, a key file or a network client.
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, List, Optional
+
+from cryptography.fernet import Fernet
+
+_worker_cipher: Optional[Fernet] = None
+
+
+def _init_worker(key: bytes) -> None:
+    global _worker_cipher
+    _worker_cipher = Fernet(key)
+
+
+def encrypt_texts(fernet: Fernet, texts: List[str]) -> List[str]:
+    return [fernet.encrypt(text.encode()).decode() for text in texts]
+
+
+def decrypt_texts(fernet: Fernet, tokens: List[str], parse: Optional[Callable] = None) -> list:
+    """Plaintexts in order, passed through `parse` if given, with None for tokens that fail either step."""
+    results = []
+    for token in tokens:
+        try:
+            text = fernet.decrypt(token.encode()).decode()
+            results.append(parse(text) if parse else text)
+        except Exception:
+            results.append(None)
+    return results
+
+
+def _encrypt_chunk(texts: List[str]) -> List[str]:
+    return encrypt_texts(_worker_cipher, texts)
+
+
+def _decrypt_chunk(tokens: List[str], parse: Optional[Callable] = None) -> list:
+    return decrypt_texts(_worker_cipher, tokens, parse)
+
+
+class CryptoPool:
+    """Encrypts and decrypts batches in order, fanning out to worker processes above `parallel_min`.
+
+    The pool is started on first use. `parse` must be a module-level function (e.g. json.loads) so
+    it can be pickled to the workers.
+    """
+
+    def __init__(self, key: bytes, processes: int, parallel_min: int, chunk_size: int):
+        self.processes = processes
+        self.parallel_min = parallel_min
+        self.chunk_size = chunk_size
+        self.parallel_batches = 0
+        self._key = key
+        self._fernet = Fernet(key)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def encrypt(self, texts: List[str]) -> List[str]:
+        return self._run(partial(encrypt_texts, self._fernet), _encrypt_chunk, texts)
+
+    def decrypt(self, tokens: List[str], parse: Optional[Callable] = None) -> list:
+        return self._run(partial(decrypt_texts, self._fernet, parse=parse), partial(_decrypt_chunk, parse=parse), tokens)
+
+    def _run(self, local, chunk_fn, items: list) -> list:
+        if self.processes <= 1 or len(items) < self.parallel_min:
+            return local(items)
+        chunks = [items[i:i + self.chunk_size] for i in range(0, len(items), self.chunk_size)]
+        results = [result for chunk in self._get_pool().map(chunk_fn, chunks) for result in chunk]
+        with self._lock:
+            self.parallel_batches += 1
+        return results
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self._key,),
+                )
+            return self._pool
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
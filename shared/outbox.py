@@ -0,0 +1,110 @@
+# Durable local outbox backed by SQLite in WAL mode
+#
+# Services append work here at local-disk speed when a downstream (MinIO, Redpanda, ...) is
+# unavailable, and a background drainer replays due entries in batches with exponential backoff.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload_path TEXT,
+    message TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (next_attempt_at);
+"""
+
+
+@dataclass
+class OutboxEntry:
+    id: int
+    kind: str
+    payload_path: Optional[str]
+    message: Dict[str, object]
+    attempts: int
+
+
+class Outbox:
+    def __init__(self, directory: str, base_backoff: float = 1.0, max_backoff: float = 300.0):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(directory, "outbox.sqlite3"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # NORMAL is durable across process crashes in WAL mode and keeps appends cheap.
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def payload_path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def enqueue(self, kind: str, message: Dict[str, object], payload_path: Optional[str] = None) -> int:
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO outbox (kind, payload_path, message, next_attempt_at, created_at) VALUES (?, ?, ?, ?, ?)",
+                (kind, payload_path, json.dumps(message), now, now),
+            )
+            self._conn.commit()
+            return cursor.lastrowid
+
+    def due(self, limit: int) -> List[OutboxEntry]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, kind, payload_path, message, attempts FROM outbox "
+                "WHERE next_attempt_at <= ? ORDER BY id LIMIT ?",
+                (time.time(), limit),
+            ).fetchall()
+        return [OutboxEntry(r[0], r[1], r[2], json.loads(r[3]), r[4]) for r in rows]
+
+    def ack(self, entry: OutboxEntry) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM outbox WHERE id = ?", (entry.id,))
+            self._conn.commit()
+        self._discard_payload(entry.payload_path)
+
+    def payload_delivered(self, entry: OutboxEntry) -> None:
+        """Record that the payload reached storage so only the message is replayed from now on."""
+        with self._lock:
+            self._conn.execute("UPDATE outbox SET payload_path = NULL WHERE id = ?", (entry.id,))
+            self._conn.commit()
+        self._discard_payload(entry.payload_path)
+        entry.payload_path = None
+
+    def retry(self, entry: OutboxEntry) -> None:
+        delay = min(self.base_backoff * (2 ** entry.attempts), self.max_backoff)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET attempts = attempts + 1, next_attempt_at = ? WHERE id = ?",
+                (time.time() + delay, entry.id),
+            )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            depth, payloads, oldest = self._conn.execute(
+                "SELECT COUNT(*), COUNT(payload_path), MIN(created_at) FROM outbox"
+            ).fetchone()
+        return {"depth": depth, "pending_payloads": payloads, "oldest_age_seconds": time.time() - oldest if oldest else 0.0}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _discard_payload(path: Optional[str]) -> None:
+        if path and os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,15 @@
+# Schema bootstrap shared by the SQLAlchemy services
+#
+# There is no migration tooling: services run create_schema at import, so schema changes are limited to
+# new tables and new indexes, both of which are created here on databases that predate them.
+
+from sqlalchemy import MetaData
+from sqlalchemy.engine import Engine
+
+
+def create_schema(metadata: MetaData, engine: Engine) -> None:
+    metadata.create_all(bind=engine)
+    # create_all skips tables that already exist, so indexes added to existing models are created here.
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
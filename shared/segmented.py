@@ -0,0 +1,330 @@
+# Segmented, random-access encrypted blob format
+#
+# Layout of a blob:
+#
+#   header   | magic "KPSG", version, flags, reserved, plaintext segment size, 16-byte salt
+#   segments | per segment: 12-byte nonce + AES-256-GCM ciphertext (+16-byte tag)
+#   index    | 12-byte nonce + AES-256-GCM sealed table of (ciphertext offset, plaintext length)
+#   trailer  | index offset, index length, magic "KPSX"
+#
+# Every object gets its own AES key derived with HKDF from the service ENCRYPTION_KEY and the
+# header salt. Segments are bound to the header and their position through the AEAD associated
+# data, and the sealed index pins the segment count, so reordering or truncation fails to decrypt.
+# Readers only need the trailer, the index and the segments covering the bytes they want.
+
+import argparse
+import base64
+import logging
+import os
+import struct
+import tempfile
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from botocore.exceptions import ClientError
+from cryptography.fernet import InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+MAGIC = b"KPSG"
+TRAILER_MAGIC = b"KPSX"
+VERSION = 1
+DEFAULT_SEGMENT_SIZE = 1024 * 1024
+NONCE_SIZE = 12
+TAG_SIZE = 16
+
+HEADER = struct.Struct(">4sBBHI16s")
+TRAILER = struct.Struct(">QI4s")
+INDEX_HEAD = struct.Struct(">QI")
+INDEX_ENTRY = struct.Struct(">QI")
+SEGMENT_NUMBER = struct.Struct(">Q")
+
+# Prefixes that never hold Fernet objects: plaintext pg_dump files from scripts/backup/create and
+# data-capture's presigned direct uploads (its PRESIGNED_PREFIX), which bypass service encryption.
+MIGRATE_EXCLUDE_PREFIXES = ("backups/", "incoming/")
+
+Fetch = Callable[[int, int], bytes]
+
+logger = logging.getLogger("segmented")
+
+
+class SegmentedBlobError(ValueError):
+    """Raised when a blob is malformed or fails authentication."""
+
+
+def derive_key(encryption_key: str) -> bytes:
+    """Turn the service ENCRYPTION_KEY (a Fernet key) into the master secret for segmented blobs."""
+    raw = base64.urlsafe_b64decode(encryption_key.encode() if isinstance(encryption_key, str) else encryption_key)
+    return HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=b"kindpath-segmented-master").derive(raw)
+
+
+def _object_key(master_key: bytes, salt: bytes) -> AESGCM:
+    key = HKDF(algorithm=hashes.SHA256(), length=32, salt=salt, info=b"kindpath-segmented-v1").derive(master_key)
+    return AESGCM(key)
+
+
+def is_segmented(prefix: bytes) -> bool:
+    return prefix[: len(MAGIC)] == MAGIC
+
+
+@dataclass(frozen=True)
+class Header:
+    segment_size: int
+    salt: bytes
+
+    def pack(self) -> bytes:
+        return HEADER.pack(MAGIC, VERSION, 0, 0, self.segment_size, self.salt)
+
+    @classmethod
+    def unpack(cls, data: bytes) -> "Header":
+        if len(data) < HEADER.size:
+            raise SegmentedBlobError("Blob is too short for a segmented header")
+        magic, version, _flags, _reserved, segment_size, salt = HEADER.unpack(data[: HEADER.size])
+        if magic != MAGIC:
+            raise SegmentedBlobError("Not a segmented blob")
+        if version != VERSION:
+            raise SegmentedBlobError(f"Unsupported segmented blob version {version}")
+        return cls(segment_size=segment_size, salt=salt)
+
+
+class SegmentWriter:
+    """Produces a blob piece by piece: header(), then seal() per segment, then finish()."""
+
+    def __init__(self, master_key: bytes, segment_size: int = DEFAULT_SEGMENT_SIZE, salt: Optional[bytes] = None):
+        self.header_info = Header(segment_size=segment_size, salt=salt or os.urandom(16))
+        self._header = self.header_info.pack()
+        self._aead = _object_key(master_key, self.header_info.salt)
+        self._entries: List[Tuple[int, int]] = []
+        self._offset = len(self._header)
+        self._plaintext_size = 0
+        self._closed = False
+
+    def header(self) -> bytes:
+        return self._header
+
+    def state(self) -> dict:
+        """JSON-serialisable progress so a writer can be resumed in another request or process."""
+        return {
+            "segment_size": self.header_info.segment_size,
+            "salt": self.header_info.salt.hex(),
+            "entries": self._entries,
+            "offset": self._offset,
+            "plaintext_size": self._plaintext_size,
+        }
+
+    @classmethod
+    def from_state(cls, master_key: bytes, state: dict) -> "SegmentWriter":
+        writer = cls(master_key, state["segment_size"], bytes.fromhex(state["salt"]))
+        writer._entries = [tuple(entry) for entry in state["entries"]]
+        writer._offset = state["offset"]
+        writer._plaintext_size = state["plaintext_size"]
+        return writer
+
+    @property
+    def plaintext_size(self) -> int:
+        return self._plaintext_size
+
+    def seal(self, plaintext: bytes) -> bytes:
+        if self._closed:
+            raise SegmentedBlobError("Writer already finished")
+        if not plaintext or len(plaintext) > self.header_info.segment_size:
+            raise SegmentedBlobError("Segment must be between 1 byte and the segment size")
+        if self._entries and self._entries[-1][1] < self.header_info.segment_size:
+            raise SegmentedBlobError("Only the final segment may be shorter than the segment size")
+        number = len(self._entries)
+        nonce = os.urandom(NONCE_SIZE)
+        sealed = nonce + self._aead.encrypt(nonce, plaintext, self._header + SEGMENT_NUMBER.pack(number))
+        self._entries.append((self._offset, len(plaintext)))
+        self._offset += len(sealed)
+        self._plaintext_size += len(plaintext)
+        return sealed
+
+    def finish(self) -> bytes:
+        if self._closed:
+            raise SegmentedBlobError("Writer already finished")
+        self._closed = True
+        table = INDEX_HEAD.pack(self._plaintext_size, len(self._entries)) + b"".join(
+            INDEX_ENTRY.pack(offset, length) for offset, length in self._entries
+        )
+        nonce = os.urandom(NONCE_SIZE)
+        index = nonce + self._aead.encrypt(nonce, table, self._header + b"index")
+        return index + TRAILER.pack(self._offset, len(index), TRAILER_MAGIC)
+
+
+def encrypt_stream(
+    chunks: Iterable[bytes], master_key: bytes, segment_size: int = DEFAULT_SEGMENT_SIZE
+) -> Iterator[bytes]:
+    """Re-chunk arbitrary plaintext pieces into segments and yield the encoded blob incrementally."""
+    writer = SegmentWriter(master_key, segment_size)
+    yield writer.header()
+    pending = bytearray()
+    for chunk in chunks:
+        pending += chunk
+        while len(pending) >= segment_size:
+            yield writer.seal(bytes(pending[:segment_size]))
+            del pending[:segment_size]
+    if pending:
+        yield writer.seal(bytes(pending))
+    yield writer.finish()
+
+
+def encrypt_bytes(data: bytes, master_key: bytes, segment_size: int = DEFAULT_SEGMENT_SIZE) -> bytes:
+    return b"".join(encrypt_stream([data], master_key, segment_size))
+
+
+class SegmentReader:
+    """Random-access reader over any byte source exposed as fetch(offset, length)."""
+
+    def __init__(self, fetch: Fetch, size: int, master_key: bytes):
+        if size < HEADER.size + TRAILER.size:
+            raise SegmentedBlobError("Blob is too short to be segmented")
+        self._fetch = fetch
+        self._header = fetch(0, HEADER.size)
+        self.header_info = Header.unpack(self._header)
+        self._aead = _object_key(master_key, self.header_info.salt)
+        index_offset, index_length, magic = TRAILER.unpack(fetch(size - TRAILER.size, TRAILER.size))
+        if magic != TRAILER_MAGIC or index_offset + index_length != size - TRAILER.size:
+            raise SegmentedBlobError("Corrupt segmented blob trailer")
+        sealed = fetch(index_offset, index_length)
+        table = self._open(sealed, b"index")
+        self.plaintext_size, count = INDEX_HEAD.unpack(table[: INDEX_HEAD.size])
+        self._entries = [
+            INDEX_ENTRY.unpack_from(table, INDEX_HEAD.size + i * INDEX_ENTRY.size) for i in range(count)
+        ]
+
+    @classmethod
+    def from_bytes(cls, data: bytes, master_key: bytes) -> "SegmentReader":
+        return cls(lambda offset, length: data[offset : offset + length], len(data), master_key)
+
+    @classmethod
+    def from_s3(cls, s3, bucket: str, key: str, master_key: bytes) -> "SegmentReader":
+        size = s3.head_object(Bucket=bucket, Key=key)["ContentLength"]
+
+        def fetch(offset: int, length: int) -> bytes:
+            rng = f"bytes={offset}-{offset + length - 1}"
+            return s3.get_object(Bucket=bucket, Key=key, Range=rng)["Body"].read()
+
+        return cls(fetch, size, master_key)
+
+    @property
+    def segment_count(self) -> int:
+        return len(self._entries)
+
+    def _open(self, sealed: bytes, aad_suffix: bytes) -> bytes:
+        try:
+            return self._aead.decrypt(sealed[:NONCE_SIZE], sealed[NONCE_SIZE:], self._header + aad_suffix)
+        except Exception as exc:
+            raise SegmentedBlobError("Segmented blob failed authentication") from exc
+
+    def read_segment(self, number: int) -> bytes:
+        offset, length = self._entries[number]
+        sealed = self._fetch(offset, NONCE_SIZE + length + TAG_SIZE)
+        return self._open(sealed, SEGMENT_NUMBER.pack(number))
+
+    def iter_segments(
+        self, start: int = 0, stop: Optional[int] = None, executor: Optional[Executor] = None
+    ) -> Iterator[bytes]:
+        """Yield decrypted segments in order; with an executor they are fetched and decrypted in parallel."""
+        numbers = range(start, self.segment_count if stop is None else stop)
+        if executor is None:
+            return (self.read_segment(n) for n in numbers)
+        return executor.map(self.read_segment, numbers)
+
+    def iter_range(self, start: int, end: int, executor: Optional[Executor] = None) -> Iterator[bytes]:
+        """Yield plaintext for the half-open byte range [start, end), touching only covering segments."""
+        end = min(end, self.plaintext_size)
+        if start >= end:
+            return
+        size = self.header_info.segment_size
+        first, last = start // size, (end - 1) // size
+        for number, segment in enumerate(self.iter_segments(first, last + 1, executor), start=first):
+            base = number * size
+            yield segment[max(start - base, 0) : end - base]
+
+    def read_range(self, start: int, end: int, executor: Optional[Executor] = None) -> bytes:
+        return b"".join(self.iter_range(start, end, executor))
+
+    def read_all(self, executor: Optional[Executor] = None) -> bytes:
+        return b"".join(self.iter_segments(executor=executor))
+
+
+def iter_legacy(lines: Iterable[bytes], fernet) -> Iterator[bytes]:
+    """Decrypt a legacy object: one Fernet token, or newline-separated tokens from chunked ingest."""
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield fernet.decrypt(line)
+
+
+def migrate_object(s3, bucket: str, key: str, fernet, master_key: bytes, segment_size: int = DEFAULT_SEGMENT_SIZE) -> bool:
+    """Rewrite one legacy Fernet object in the segmented format. Returns False if it was already migrated or empty."""
+    size = s3.head_object(Bucket=bucket, Key=key)["ContentLength"]
+    if size == 0:
+        return False  # a ranged get of an empty object is an InvalidRange, and there is nothing to rewrite
+    head = s3.get_object(Bucket=bucket, Key=key, Range=f"bytes=0-{min(size, len(MAGIC)) - 1}")["Body"].read()
+    if is_segmented(head):
+        return False
+    body = s3.get_object(Bucket=bucket, Key=key)["Body"]
+    # The legacy body is read a line (one Fernet token) at a time; the rewritten object is spooled to
+    # disk rather than memory before upload.
+    with tempfile.TemporaryFile() as spool:
+        for piece in encrypt_stream(iter_legacy(body.iter_lines(), fernet), master_key, segment_size):
+            spool.write(piece)
+        spool.seek(0)
+        s3.upload_fileobj(spool, bucket, key)
+    return True
+
+
+def migrate_bucket(
+    s3, bucket: str, fernet, master_key: bytes, prefix: str = "", exclude: Sequence[str] = MIGRATE_EXCLUDE_PREFIXES
+) -> int:
+    """Migrate every legacy object under prefix; objects that are not Fernet tokens or fail to transfer are logged and left alone."""
+    migrated = 0
+    for page in s3.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get("Contents", []):
+            key = obj["Key"]
+            if key.startswith(tuple(exclude)):
+                continue
+            try:
+                if migrate_object(s3, bucket, key, fernet, master_key):
+                    migrated += 1
+            except InvalidToken:
+                logger.warning("Skipping %s: not a Fernet-encrypted object", key)
+            except ClientError as exc:
+                logger.error("Skipping %s: %s", key, exc)
+    return migrated
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import boto3
+    from cryptography.fernet import Fernet
+
+    parser = argparse.ArgumentParser(description="Segmented blob maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate = sub.add_parser("migrate", help="Rewrite legacy Fernet objects in the segmented format")
+    migrate.add_argument("--bucket", default=os.getenv("MINIO_BUCKET", "kindpath-data"))
+    migrate.add_argument("--prefix", default="")
+    migrate.add_argument(
+        "--exclude", action="append", default=None, help=f"Key prefix to skip (default: {', '.join(MIGRATE_EXCLUDE_PREFIXES)})"
+    )
+    args = parser.parse_args(argv)
+
+    key = os.getenv("ENCRYPTION_KEY")
+    if not key:
+        raise SystemExit("ENCRYPTION_KEY is required")
+    s3 = boto3.client(
+        "s3",
+        endpoint_url=f"http://{os.getenv('MINIO_ENDPOINT', 'minio:9000')}",
+        aws_access_key_id=os.getenv("MINIO_ACCESS_KEY"),
+        aws_secret_access_key=os.getenv("MINIO_SECRET_KEY"),
+    )
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    exclude = MIGRATE_EXCLUDE_PREFIXES if args.exclude is None else args.exclude
+    count = migrate_bucket(s3, args.bucket, Fernet(key.encode()), derive_key(key), args.prefix, exclude)
+    print(f"Migrated {count} objects in {args.bucket}")
+
+
+if __name__ == "__main__":
+    main()
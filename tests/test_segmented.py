@@ -0,0 +1,116 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from botocore.exceptions import ClientError
+from cryptography.fernet import Fernet
+
+from shared.segmented import (
+    SegmentReader,
+    SegmentWriter,
+    SegmentedBlobError,
+    derive_key,
+    encrypt_bytes,
+    encrypt_stream,
+    is_segmented,
+    iter_legacy,
+    migrate_bucket,
+)
+
+
+class StreamingBody(io.BytesIO):
+    def iter_lines(self):
+        return iter(self.read().splitlines())
+
+
+class BucketStub:
+    def __init__(self, objects):
+        self.objects = dict(objects)
+
+    def get_paginator(self, name):
+        return self
+
+    def paginate(self, Bucket, Prefix):
+        return [{"Contents": [{"Key": key} for key in sorted(self.objects) if key.startswith(Prefix)]}]
+
+    def head_object(self, Bucket, Key):
+        return {"ContentLength": len(self.get_object(Bucket, Key)["Body"].getvalue())}
+
+    def get_object(self, Bucket, Key, Range=None):
+        data = self.objects[Key]
+        if isinstance(data, ClientError):
+            raise data
+        if Range:
+            first, last = Range[len("bytes="):].split("-")
+            if int(first) >= len(data):
+                raise ClientError({"Error": {"Code": "InvalidRange"}}, "GetObject")
+            data = data[int(first) : int(last) + 1]
+        return {"Body": StreamingBody(data)}
+
+    def upload_fileobj(self, fileobj, Bucket, Key):
+        self.objects[Key] = fileobj.read()
+
+
+def test_round_trip_and_random_access():
+    key = derive_key(Fernet.generate_key().decode())
+    data = bytes(range(256)) * 40
+    blob = b"".join(encrypt_stream([data[:1000], data[1000:]], key, segment_size=1024))
+    assert is_segmented(blob)
+
+    reader = SegmentReader.from_bytes(blob, key)
+    assert reader.plaintext_size == len(data)
+    assert reader.segment_count == 10
+    assert reader.read_range(1500, 4100) == data[1500:4100]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        assert reader.read_all(executor=pool) == data
+
+
+def test_tampering_and_wrong_key_are_rejected():
+    key = derive_key(Fernet.generate_key().decode())
+    blob = bytearray(encrypt_bytes(b"x" * 3000, key, segment_size=1024))
+    blob[40] ^= 1
+    with pytest.raises(SegmentedBlobError):
+        SegmentReader.from_bytes(bytes(blob), key).read_segment(0)
+    with pytest.raises(SegmentedBlobError):
+        SegmentReader.from_bytes(encrypt_bytes(b"x", key), derive_key(Fernet.generate_key().decode()))
+
+
+def test_legacy_fernet_objects_migrate():
+    fernet_key = Fernet.generate_key()
+    fernet = Fernet(fernet_key)
+    legacy = fernet.encrypt(b"hello ") + b"\n" + fernet.encrypt(b"world") + b"\n"
+    assert not is_segmented(legacy)
+
+    key = derive_key(fernet_key.decode())
+    migrated = b"".join(encrypt_stream(iter_legacy(legacy.splitlines(), fernet), key))
+    assert SegmentReader.from_bytes(migrated, key).read_all() == b"hello world"
+
+
+def test_bucket_migration_skips_objects_that_are_not_fernet():
+    fernet_key = Fernet.generate_key()
+    fernet = Fernet(fernet_key)
+    mixed = fernet.encrypt(b"head") + b"\nplain text tail\n"
+    dump = b"-- PostgreSQL database dump\n"
+    s3 = BucketStub({
+        "a/legacy": fernet.encrypt(b"legacy"),
+        "b/mixed": mixed,
+        "backups/db_1.sql": dump,
+        "c/empty": b"",
+        "d/denied": ClientError({"Error": {"Code": "AccessDenied"}}, "GetObject"),
+    })
+
+    key = derive_key(fernet_key.decode())
+    assert migrate_bucket(s3, "bucket", fernet, key) == 1
+    assert SegmentReader.from_bytes(s3.objects["a/legacy"], key).read_all() == b"legacy"
+    assert s3.objects["b/mixed"] == mixed
+    assert s3.objects["backups/db_1.sql"] == dump
+    assert s3.objects["c/empty"] == b""
+
+
+def test_writer_resumes_from_saved_state():
+    key = derive_key(Fernet.generate_key().decode())
+    writer = SegmentWriter(key, segment_size=4)
+    pieces = [writer.header(), writer.seal(b"abcd")]
+    resumed = SegmentWriter.from_state(key, writer.state())
+    pieces += [resumed.seal(b"efgh"), resumed.seal(b"ij"), resumed.finish()]
+    assert SegmentReader.from_bytes(b"".join(pieces), key).read_all() == b"abcdefghij"
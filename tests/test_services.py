@@ -1,6 +1,11 @@
 import importlib.util
+import io
+import json
 import os
+import time
+from datetime import datetime, timedelta
 from pathlib import Path
+from types import SimpleNamespace
 
 from cryptography.fernet import Fernet
 from fastapi.testclient import TestClient
@@ -13,6 +18,12 @@ def load_module(path: Path, name: str):
     return module
 
 
+class FakeTask:
+    task_uid = 0
+    status = "succeeded"
+    error = None
+
+
 class FakeIndex:
     def __init__(self):
         self.documents = {}
@@ -20,22 +31,67 @@ class FakeIndex:
     def add_documents(self, docs):
         for doc in docs:
             self.documents[doc["id"]] = doc
+        return FakeTask()
 
     def update_documents(self, docs):
         for doc in docs:
             self.documents[doc["id"]] = doc
+        return FakeTask()
+
+    def delete_documents(self, ids):
+        for doc_id in ids:
+            self.documents.pop(doc_id, None)
+        return FakeTask()
+
+    def get_documents(self, params):
+        fields = params["fields"].split(",")
+        docs = list(self.documents.values())[params["offset"]:params["offset"] + params["limit"]]
 
-    def search(self, q):
+        class _Page:
+            results = [{k: doc[k] for k in fields if k in doc} for doc in docs]
+
+        return _Page()
+
+    def search(self, q, opt_params=None):
         hits = [doc for doc in self.documents.values() if q.lower() in (doc.get("title") or "").lower()]
-        return {"hits": hits}
+        return {"hits": hits[:(opt_params or {}).get("limit", 20)]}
+
+
+class FailingIndex(FakeIndex):
+    def add_documents(self, docs):
+        raise ConnectionError("meilisearch unavailable")
+
+    def search(self, q, opt_params=None):
+        raise ConnectionError("meilisearch unavailable")
 
 
 class FakeMeili:
     def __init__(self):
-        self.index_obj = FakeIndex()
+        self.indexes = {"literature": FakeIndex()}
+
+    @property
+    def index_obj(self):
+        return self.indexes["literature"]
+
+    @index_obj.setter
+    def index_obj(self, index):
+        self.indexes["literature"] = index
+
+    def index(self, name):
+        return self.indexes.setdefault(name, FakeIndex())
 
-    def index(self, _name):
-        return self.index_obj
+    def wait_for_task(self, uid, timeout_in_ms=5000):
+        return FakeTask()
+
+    def swap_indexes(self, pairs):
+        for pair in pairs:
+            a, b = pair["indexes"]
+            self.indexes[a], self.indexes[b] = self.index(b), self.index(a)
+        return FakeTask()
+
+    def delete_index(self, uid):
+        self.indexes.pop(uid, None)
+        return FakeTask()
 
     def get_indexes(self):
         class _Result:
@@ -46,12 +102,377 @@ class FakeMeili:
         return _Result()
 
     def create_index(self, uid, options=None):
-        return {"uid": uid, "options": options}
+        self.index(uid)
+        return FakeTask()
 
     def health(self):
         return {"status": "available"}
 
 
+class FakeS3:
+    def __init__(self):
+        self.objects = {}
+        self.uploads = {}
+        self.metadata = {}
+        self.encryption = {}
+        self.fail = False
+
+    def put_object(self, Bucket, Key, Body):
+        if self.fail:
+            raise ConnectionError("minio unavailable")
+        self.objects[Key] = bytes(Body)
+
+    def upload_file(self, Filename, Bucket, Key):
+        with open(Filename, "rb") as fh:
+            self.put_object(Bucket=Bucket, Key=Key, Body=fh.read())
+
+    def head_bucket(self, Bucket):
+        if self.fail:
+            raise ConnectionError("minio unavailable")
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise KeyError(Key)
+        head = {"ContentLength": len(self.objects[Key]), "Metadata": self.metadata.get(Key, {})}
+        if self.encryption.get(Key):
+            head["ServerSideEncryption"] = self.encryption[Key]
+        return head
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+    def get_object(self, Bucket, Key, Range=None):
+        data = self.objects[Key]
+        if Range:
+            first, last = Range[len("bytes="):].split("-")
+            data = data[int(first) : int(last) + 1]
+        return {"Body": io.BytesIO(data)}
+
+    def create_multipart_upload(self, Bucket, Key, Metadata=None, **kwargs):
+        upload_id = f"upload-{len(self.uploads) + 1}"
+        self.uploads[upload_id] = {}
+        self.metadata[Key] = Metadata or {}
+        self.encryption[Key] = kwargs.get("ServerSideEncryption")
+        return {"UploadId": upload_id}
+
+    def generate_presigned_url(self, operation, Params, ExpiresIn):
+        return f"http://minio.test/{Params['Key']}?uploadId={Params['UploadId']}&partNumber={Params['PartNumber']}"
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.uploads[UploadId][PartNumber] = bytes(Body)
+        return {"ETag": f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.uploads.pop(UploadId)
+        self.objects[Key] = b"".join(parts[p["PartNumber"]] for p in MultipartUpload["Parts"])
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId, None)
+
+    def list_buckets(self):
+        return {"Buckets": [{"Name": "kindpath-data"}]}
+
+
+class FakeFuture:
+    def __init__(self, exc=None):
+        self.exc = exc
+
+    def add_callback(self, fn):
+        if self.exc is None:
+            fn(None)
+        return self
+
+    def add_errback(self, fn):
+        if self.exc is not None:
+            fn(self.exc)
+        return self
+
+    def succeeded(self):
+        return self.exc is None
+
+
+class FakeProducer:
+    def __init__(self, *args, **kwargs):
+        self.sent = []
+        self.fail = False
+
+    def send(self, topic, value):
+        self.sent.append((topic, value))
+        return FakeFuture(RuntimeError("broker unavailable") if self.fail else None)
+
+    def flush(self, timeout=None):
+        pass
+
+    def metrics(self):
+        return {"producer-metrics": {"batch-size-avg": 128.0}}
+
+
+def load_data_capture(monkeypatch, tmp_path, **env):
+    import boto3
+    import kafka
+
+    monkeypatch.setenv("ENCRYPTION_KEY", Fernet.generate_key().decode())
+    monkeypatch.setenv("OUTBOX_DIR", str(tmp_path / "outbox"))
+    monkeypatch.setenv("MANIFEST_PATH", str(tmp_path / "manifest.sqlite3"))
+    monkeypatch.setenv("UPLOAD_SESSION_DIR", str(tmp_path / "uploads"))
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.setattr(kafka, "KafkaProducer", FakeProducer)
+    monkeypatch.setattr(boto3, "client", lambda *args, **kwargs: FakeS3())
+    return load_module(Path("services/data-capture/app/main.py"), "dc_main")
+
+
+def test_data_capture_streams_multipart_upload(monkeypatch, tmp_path):
+    dc_main = load_data_capture(monkeypatch, tmp_path, INGEST_CHUNK_SIZE="1024", BLOB_SEGMENT_SIZE="512")
+    client = TestClient(dc_main.app)
+    payload = os.urandom(2500)
+
+    response = client.post("/ingest", files={"file": ("sensor.bin", payload)}, params={"metadata": "m"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["size"] == len(payload)
+    assert body["throughput_bytes_per_sec"] > 0
+
+    key = f"objects/{body['digest']}"
+    reader = dc_main.SegmentReader.from_bytes(dc_main.s3.objects[key], dc_main.blob_key)
+    assert reader.segment_count == 5
+    assert reader.read_all() == payload
+    message = dc_main.producer.sent[0][1]
+    assert (message["filename"], message["metadata"], message["object_key"]) == ("sensor.bin", "m", key)
+
+    ranged = client.get(f"/objects/{key}", headers={"Range": "bytes=600-1999"})
+    assert ranged.status_code == 206
+    assert ranged.content == payload[600:2000]
+
+
+def test_data_capture_publish_failures_go_to_outbox(monkeypatch, tmp_path):
+    dc_main = load_data_capture(monkeypatch, tmp_path)
+    client = TestClient(dc_main.app)
+
+    dc_main.producer.fail = True
+    response = client.post("/ingest", files={"file": ("a.csv", b"1,2,3")})
+    assert response.status_code == 200
+    metrics = client.get("/metrics").json()
+    assert metrics["publish"]["in_flight"] == 0
+    assert metrics["publish"]["failed"] == 1
+    assert metrics["publish"]["batch_size_avg"] == 128.0
+    assert metrics["outbox"]["depth"] == 1
+
+    dc_main.producer.fail = False
+    dc_main.outbox.base_backoff = 0
+    assert dc_main.drain_outbox_once() == 1
+    assert client.get("/metrics").json()["outbox"]["depth"] == 0
+
+
+def test_data_capture_storage_outage_is_queued_and_replayed(monkeypatch, tmp_path):
+    dc_main = load_data_capture(monkeypatch, tmp_path)
+    client = TestClient(dc_main.app)
+    payload = os.urandom(3000)
+
+    dc_main.s3.fail = True
+    dc_main.outbox.base_backoff = 0
+    response = client.post("/ingest", files={"file": ("dump.bin", payload)})
+    assert response.status_code == 202
+    assert response.json()["status"] == "queued"
+    assert dc_main.producer.sent == []
+    assert dc_main.drain_outbox_once() == 0
+
+    dc_main.s3.fail = False
+    assert dc_main.drain_outbox_once() == 1
+    key = f"objects/{response.json()['digest']}"
+    reader = dc_main.SegmentReader.from_bytes(dc_main.s3.objects[key], dc_main.blob_key)
+    assert reader.read_all() == payload
+    assert dc_main.producer.sent[0][1]["filename"] == "dump.bin"
+    assert not list((tmp_path / "outbox").glob("*.blob"))
+    assert client.get("/manifest/dump.bin").json()["current"]["digest"] == response.json()["digest"]
+
+
+def test_data_capture_deduplicates_identical_content(monkeypatch, tmp_path):
+    dc_main = load_data_capture(monkeypatch, tmp_path)
+    client = TestClient(dc_main.app)
+
+    first = client.post("/ingest", files={"file": ("a.csv", b"same bytes")}).json()
+    second = client.post("/ingest", files={"file": ("b.csv", b"same bytes")}).json()
+    other = client.post("/ingest", files={"file": ("a.csv", b"different")}).json()
+
+    assert second["status"] == "deduplicated"
+    assert second["digest"] == first["digest"] != other["digest"]
+    assert len(dc_main.s3.objects) == 2
+    assert len(dc_main.producer.sent) == 3
+    history = client.get("/manifest/a.csv").json()["history"]
+    assert [h["digest"] for h in history] == [other["digest"], first["digest"]]
+    dedup = client.get("/metrics").json()["dedup"]
+    assert (dedup["uploads"], dedup["hits"], dedup["bytes_skipped"]) == (3, 1, len(b"same bytes"))
+
+
+def test_data_capture_uploads_overlap_storage_io(monkeypatch, tmp_path):
+    import asyncio
+    import time
+
+    import httpx
+
+    dc_main = load_data_capture(monkeypatch, tmp_path, STORAGE_CONCURRENCY="8")
+    original_put = dc_main.s3.put_object
+
+    def slow_put(**kwargs):
+        time.sleep(0.2)
+        original_put(**kwargs)
+
+    dc_main.s3.put_object = slow_put
+
+    async def run_uploads():
+        transport = httpx.ASGITransport(app=dc_main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(
+                *(client.post("/ingest", files={"file": (f"f{i}.csv", f"x{i}".encode())}) for i in range(8))
+            )
+
+    started = time.perf_counter()
+    responses = asyncio.run(run_uploads())
+    elapsed = time.perf_counter() - started
+    assert all(r.status_code == 200 for r in responses)
+    # Serialised on the event loop this would take 8 x 0.2s.
+    assert elapsed < 1.0
+
+
+def test_data_capture_presigned_upload_publishes_on_complete(monkeypatch, tmp_path):
+    dc_main = load_data_capture(monkeypatch, tmp_path, PRESIGNED_PART_SIZE="1024")
+    client = TestClient(dc_main.app)
+    request = {"filename": "big.bin", "size": 2500, "metadata": "déjà"}
+    # Without MinIO server-side encryption, direct uploads are refused rather than stored in plaintext.
+    assert client.post("/uploads/presigned", json=request).status_code == 503
+
+    monkeypatch.setattr(dc_main, "PRESIGNED_SSE", "AES256")
+    created = client.post("/uploads/presigned", json=request)
+    assert created.status_code == 200
+    upload = created.json()
+    assert upload["key"].startswith("incoming/") and upload["encryption"] == "AES256"
+    assert [p["part_number"] for p in upload["parts"]] == [1, 2, 3]
+    assert dc_main.producer.sent == []
+
+    # The client PUTs each part straight to MinIO using the presigned URLs.
+    etags = [
+        dc_main.s3.upload_part(
+            Bucket="kindpath-data", Key=upload["key"], UploadId=upload["upload_id"], PartNumber=n, Body=b"z" * 10
+        )["ETag"]
+        for n in (1, 2, 3)
+    ]
+    completed = client.post(
+        f"/uploads/presigned/{upload['upload_id']}/complete",
+        json={"key": upload["key"], "parts": [{"part_number": n, "etag": e} for n, e in zip((1, 2, 3), etags)]},
+    )
+    assert completed.status_code == 200
+    assert completed.json()["size"] == 30
+    message = dc_main.producer.sent[0][1]
+    assert (message["filename"], message["metadata"], message["object_key"]) == ("big.bin", "déjà", upload["key"])
+    assert message["encryption"] == "sse"
+
+    # An object that reached MinIO unencrypted is discarded instead of ingested.
+    plain = client.post("/uploads/presigned", json=request).json()
+    dc_main.s3.encryption[plain["key"]] = None
+    dc_main.s3.upload_part(Bucket="kindpath-data", Key=plain["key"], UploadId=plain["upload_id"], PartNumber=1, Body=b"p")
+    refused = client.post(
+        f"/uploads/presigned/{plain['upload_id']}/complete",
+        json={"key": plain["key"], "parts": [{"part_number": 1, "etag": "etag-1"}]},
+    )
+    assert refused.status_code == 409 and plain["key"] not in dc_main.s3.objects
+    assert len(dc_main.producer.sent) == 1
+
+
+def test_data_capture_resumable_upload_session(monkeypatch, tmp_path):
+    dc_main = load_data_capture(monkeypatch, tmp_path, BLOB_SEGMENT_SIZE="16", INGEST_CHUNK_SIZE="64")
+    client = TestClient(dc_main.app)
+    payload = os.urandom(150)
+
+    session = client.post("/uploads", json={"filename": "field.log", "metadata": "site-3"}).json()
+    url = f"/uploads/{session['id']}"
+    assert client.put(url, content=payload[:96], headers={"Upload-Offset": "0"}).status_code == 204
+    # A retry of an already-accepted chunk is rejected with the current offset.
+    stale = client.put(url, content=payload[:96], headers={"Upload-Offset": "0"})
+    assert stale.status_code == 409
+    assert stale.headers["Upload-Offset"] == "96"
+    assert client.head(url).headers["Upload-Offset"] == "96"
+
+    assert client.put(url, content=payload[96:], headers={"Upload-Offset": "96"}).status_code == 204
+    done = client.post(f"{url}/finalize")
+    assert done.status_code == 200
+    assert done.json()["size"] == len(payload)
+
+    key = f"uploads/{session['id']}"
+    assert dc_main.SegmentReader.from_bytes(dc_main.s3.objects[key], dc_main.blob_key).read_all() == payload
+    assert dc_main.producer.sent[0][1]["object_key"] == key
+    assert client.get(url).status_code == 404
+
+    # Unknown ids are rejected before a lock is created; finalize drops the session's lock.
+    assert client.put("/uploads/bogus", content=b"x", headers={"Upload-Offset": "0"}).status_code == 404
+    assert client.post("/uploads/bogus/finalize").status_code == 404
+    assert dc_main.SESSION_LOCKS == {}
+
+
+def test_data_capture_expired_upload_sessions_are_collected(monkeypatch, tmp_path):
+    dc_main = load_data_capture(monkeypatch, tmp_path, UPLOAD_SESSION_TTL_SECONDS="0")
+    client = TestClient(dc_main.app)
+
+    session = client.post("/uploads", json={"filename": "stale.log"}).json()
+    assert dc_main.s3.uploads
+    dc_main.SESSION_LOCKS[session["id"]] = dc_main.asyncio.Lock()
+    assert dc_main.gc_upload_sessions() == 1
+    assert dc_main.SESSION_LOCKS == {}
+    assert not dc_main.s3.uploads
+    assert not (tmp_path / "uploads" / f"{session['id']}.spool").exists()
+
+
+def test_data_capture_batch_ingest_files_and_archive(monkeypatch, tmp_path):
+    import tarfile
+
+    dc_main = load_data_capture(monkeypatch, tmp_path)
+    client = TestClient(dc_main.app)
+
+    bundle = io.BytesIO()
+    with tarfile.open(fileobj=bundle, mode="w:gz") as tar:
+        for name, data in (("t1.csv", b"tar one"), ("t2.csv", b"loose one")):
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+    response = client.post(
+        "/ingest/batch",
+        files=[
+            ("files", ("l1.csv", b"loose one")),
+            ("files", ("l2.csv", b"loose two")),
+            ("archive", ("sync.tar.gz", bundle.getvalue())),
+        ],
+        params={"metadata": "device-7"},
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["stored"], body["errors"]) == (4, 0)
+    assert [f["file"] for f in body["files"]] == ["l1.csv", "l2.csv", "t1.csv", "t2.csv"]
+    assert len(dc_main.s3.objects) == 3
+    assert sorted(m["filename"] for _, m in dc_main.producer.sent) == ["l1.csv", "l2.csv", "t1.csv", "t2.csv"]
+
+
+def test_data_capture_reports_stage_metrics(monkeypatch, tmp_path):
+    dc_main = load_data_capture(monkeypatch, tmp_path)
+    client = TestClient(dc_main.app)
+
+    client.post("/ingest", files={"file": ("ok.csv", b"12345")})
+    dc_main.s3.fail = True
+    client.post("/ingest", files={"file": ("later.csv", b"678")})
+
+    pipeline = client.get("/metrics").json()["pipeline"]
+    for stage in ("read", "digest", "encrypt", "store", "publish"):
+        assert pipeline["stages"][stage]["count"] >= 1
+    assert pipeline["stages"]["outbox"]["count"] == 1
+    assert pipeline["errors"]["store"] == 1
+    assert pipeline["bytes"]["received"] == 8
+    assert pipeline["in_flight"] == 0
+
+    text = client.get("/metrics", params={"format": "prometheus"}).text
+    assert 'data_capture_stage_seconds_count{stage="store"} 2' in text
+    assert 'data_capture_stage_errors_total{stage="store"} 1' in text
+
+
 def test_ecological_eval_create_and_read(tmp_path, monkeypatch):
     db_file = tmp_path / "eco.db"
     os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
@@ -80,8 +501,9 @@ def test_digital_library_create_and_search(tmp_path, monkeypatch):
     os.environ["ENCRYPTION_KEY"] = Fernet.generate_key().decode()
     os.environ["MEILISEARCH_URL"] = "http://example.meili"
     os.environ["MEILISEARCH_API_KEY"] = "test"
+    os.environ["LOCAL_SEARCH_PATH"] = str(tmp_path / "fts.sqlite3")
     dl_main = load_module(Path("services/digital-library/app/main.py"), "dl_main")
-    dl_main.meili = FakeMeili()
+    dl_main.meili = dl_main.search_meili = FakeMeili()
 
     client = TestClient(dl_main.app)
     created = client.post("/literature", json={"title": "Test Doc", "content": "Hello world"})
@@ -93,6 +515,533 @@ def test_digital_library_create_and_search(tmp_path, monkeypatch):
     assert fetched.status_code == 200
     assert fetched.json()["content"] == "Hello world"
 
+    assert dl_main.drain_index_queue() == 1
     search = client.get("/literature/search", params={"q": "test"})
     assert search.status_code == 200
     assert search.json()["hits"]
+
+
+def load_digital_library(monkeypatch, tmp_path, **env):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'library.db'}")
+    monkeypatch.setenv("ENCRYPTION_KEY", Fernet.generate_key().decode())
+    monkeypatch.setenv("MEILISEARCH_URL", "http://example.meili")
+    monkeypatch.setenv("MEILISEARCH_API_KEY", "test")
+    monkeypatch.setenv("LOCAL_SEARCH_PATH", str(tmp_path / "fts.sqlite3"))
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    dl_main = load_module(Path("services/digital-library/app/main.py"), "dl_main")
+    dl_main.meili = dl_main.search_meili = FakeMeili()
+    return dl_main
+
+
+def test_digital_library_index_queue_coalesces_and_retries(tmp_path, monkeypatch):
+    dl_main = load_digital_library(monkeypatch, tmp_path)
+    client = TestClient(dl_main.app)
+
+    lit = client.post("/literature", json={"title": "Soil", "content": "v1"}).json()
+    for n in (2, 3):
+        client.put(f"/literature/{lit['id']}", json={"content": f"v{n}", "change_reason": "edit"})
+    assert client.get("/metrics").json()["index"]["queue_depth"] == 3
+
+    healthy_index = dl_main.meili.index_obj
+    dl_main.meili.index_obj = FailingIndex()
+    assert dl_main.drain_index_queue() == 0
+    assert client.get("/metrics").json()["index"]["failed_batches"] == 1
+
+    dl_main.meili.index_obj = healthy_index
+    with dl_main.SessionLocal() as db:
+        db.query(dl_main.LiteratureIndexQueue).update({"next_attempt_at": dl_main.datetime.utcnow()})
+        db.commit()
+    assert dl_main.drain_index_queue() == 3
+    assert healthy_index.documents[lit["id"]]["content"] == "v3"
+    index_metrics = client.get("/metrics").json()["index"]
+    assert (index_metrics["queue_depth"], index_metrics["indexed"]) == (0, 1)
+
+
+def test_digital_library_bulk_import_reports_per_line(tmp_path, monkeypatch):
+    # Two-row batches go through the worker processes.
+    for name, value in {"ENCRYPT_WORKERS": "2", "CRYPTO_PARALLEL_MIN": "2", "CRYPTO_CHUNK_SIZE": "1"}.items():
+        monkeypatch.setenv(name, value)
+    dl_main = load_digital_library(monkeypatch, tmp_path, BULK_BATCH_SIZE="2")
+    client = TestClient(dl_main.app)
+
+    lines = [
+        json.dumps({"title": "A", "content": "alpha"}),
+        "{not json",
+        json.dumps({"title": "B", "content": "beta", "currency_date": "yesterday"}),
+        json.dumps({"title": "C", "content": "gamma", "currency_date": "2024-01-01"}),
+        "",
+        json.dumps({"title": "D", "content": "delta"}),
+    ]
+    response = client.post("/literature/bulk", content="\n".join(lines).encode())
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["inserted"], body["errors"]) == (3, 2)
+    assert [r["line"] for r in body["results"]] == [1, 2, 3, 4, 6]
+    assert "error" in body["results"][1] and "currency_date" in body["results"][2]["error"]
+
+    ids = [r["id"] for r in body["results"] if "id" in r]
+    assert client.get(f"/literature/{ids[1]}").json()["content"] == "gamma"
+    assert dl_main.drain_index_queue() == 3
+    assert set(dl_main.meili.index_obj.documents) == set(ids)
+    assert dl_main.crypto_pool._pool is not None
+    dl_main.crypto_pool.shutdown()
+
+
+def test_digital_library_reindex_resumes_and_swaps_shadow_index(tmp_path, monkeypatch):
+    dl_main = load_digital_library(monkeypatch, tmp_path)
+    client = TestClient(dl_main.app)
+    ids = [client.post("/literature", json={"title": f"Doc {n}", "content": f"body {n}"}).json()["id"] for n in range(5)]
+    assert dl_main.drain_index_queue() == 5
+
+    # Simulate drift: a wiped document, a stale one and one that no longer exists in the database.
+    live = dl_main.meili.index_obj
+    del live.documents[ids[0]]
+    live.documents[ids[1]]["stamp"] = "outdated"
+    live.documents[999] = {"id": 999, "title": "ghost", "stamp": "x"}
+    report = client.get("/admin/index/consistency").json()
+    assert (report["consistent"], report["missing"], report["stale"], report["extra"]) == (False, 1, 1, 1)
+    assert report["sample"]["missing"] == [ids[0]]
+
+    # An interrupted run left a checkpoint after the first two rows; resuming only streams the rest.
+    with dl_main.SessionLocal() as db:
+        db.add(dl_main.ReindexCheckpoint(shadow_uid="literature_shadow", last_id=ids[1], indexed=2))
+        db.commit()
+    result = dl_main.reindex_literature(batch_size=2)
+    assert result["indexed"] == 5
+    assert "literature_shadow" not in dl_main.meili.indexes
+    assert set(dl_main.meili.index_obj.documents) == set(ids[2:])
+    # The post-swap repair re-queues rows the shadow never saw.
+    assert result["consistency"]["missing"] == 2
+    assert dl_main.drain_index_queue() == 2
+    assert client.get("/admin/index/consistency").json()["consistent"] is True
+
+
+def test_digital_library_search_falls_back_to_local_index(tmp_path, monkeypatch):
+    dl_main = load_digital_library(monkeypatch, tmp_path)
+    client = TestClient(dl_main.app)
+    soil = client.post("/literature", json={"title": "Soil carbon", "content": "Cover crops raise soil organic carbon"}).json()
+    client.post("/literature", json={"title": "Wetlands", "content": "Peat stores carbon for millennia"})
+    client.put(f"/literature/{soil['id']}", json={"content": "No-till farming and mycorrhizae", "change_reason": "rev"})
+
+    dl_main.meili.index_obj = FailingIndex()
+    result = client.get("/literature/search", params={"q": "carbon"})
+    assert result.status_code == 200
+    body = result.json()
+    assert body["source"] == "local"
+    # Title matches outrank body matches; the updated body no longer mentions carbon.
+    assert [hit["title"] for hit in body["hits"]] == ["Soil carbon", "Wetlands"]
+    assert client.get("/literature/search", params={"q": "mycorr"}).json()["hits"][0]["id"] == soil["id"]
+    assert client.get("/literature/search", params={"q": 'peat" OR ('}).json()["hits"][0]["title"] == "Wetlands"
+
+    search_metrics = client.get("/metrics").json()["search"]
+    assert search_metrics["meili_down"] is True
+    assert search_metrics["fallbacks"] == 3
+    assert search_metrics["local_latency"]["count"] == 3
+    assert search_metrics["local_documents"] == 2
+
+
+def test_digital_library_search_breaker_ignores_rejected_queries(tmp_path, monkeypatch):
+    from meilisearch.errors import MeilisearchApiError
+
+    class RejectingIndex(FakeIndex):
+        def search(self, q, opt_params=None):
+            raise MeilisearchApiError("bad query", SimpleNamespace(status_code=400, text=""))
+
+    dl_main = load_digital_library(monkeypatch, tmp_path)
+    client = TestClient(dl_main.app)
+    client.post("/literature", json={"title": "Soil carbon", "content": "baseline"})
+    assert client.get("/literature/search", params={"q": "soil", "limit": 0}).status_code == 422
+    assert client.get("/literature/search", params={"q": "soil", "limit": dl_main.SEARCH_LIMIT_MAX + 1}).status_code == 422
+
+    dl_main.meili.index_obj = RejectingIndex()
+    assert client.get("/literature/search", params={"q": "soil"}).json()["source"] == "local"
+    assert client.get("/metrics").json()["search"]["meili_down"] is False
+
+
+def test_digital_library_search_cache_invalidated_by_writes(tmp_path, monkeypatch):
+    dl_main = load_digital_library(monkeypatch, tmp_path)
+    client = TestClient(dl_main.app)
+    client.post("/literature", json={"title": "Soil survey", "content": "baseline"})
+    dl_main.drain_index_queue()
+
+    calls = []
+    index = dl_main.meili.index_obj
+    original_search = index.search
+    index.search = lambda q, opt_params=None: calls.append(q) or original_search(q, opt_params)
+
+    first = client.get("/literature/search", params={"q": "Soil"}).json()
+    assert client.get("/literature/search", params={"q": "  soil "}).json() == first
+    assert len(calls) == 1
+
+    # A write invalidates the cache, and so does the index catching up with it once the task is applied.
+    client.post("/literature", json={"title": "Soil moisture", "content": "sensor"})
+    generations = []
+    wait_for_task = dl_main.meili.wait_for_task
+
+    def recording_wait(uid, **kwargs):
+        generations.append(dl_main.search_cache.get(("probe",))[1])
+        return wait_for_task(uid, **kwargs)
+
+    dl_main.meili.wait_for_task = recording_wait
+    dl_main.drain_index_queue()
+    assert dl_main.search_cache.get(("probe",))[1] > generations[0]
+    assert len(client.get("/literature/search", params={"q": "soil"}).json()["hits"]) == 2
+    assert len(calls) == 2
+    assert len(client.get("/literature/search", params={"q": "soil", "limit": 1}).json()["hits"]) == 1
+
+    # A result computed under an older generation is never stored.
+    _, generation = dl_main.search_cache.get(("stale",))
+    dl_main.search_cache.invalidate()
+    dl_main.search_cache.put(("stale",), {"hits": []}, generation)
+    cache = client.get("/metrics").json()["search"]["cache"]
+    assert (cache["hits"], cache["discarded"], cache["size"]) == (1, 1, 0)
+
+
+def test_digital_library_content_cache_budget_and_invalidation(tmp_path, monkeypatch):
+    dl_main = load_digital_library(monkeypatch, tmp_path, CONTENT_CACHE_MAX_BYTES="2000")
+    client = TestClient(dl_main.app)
+    ids = [client.post("/literature", json={"title": f"T{n}", "content": "x" * 600}).json()["id"] for n in range(3)]
+
+    for lit_id in ids:
+        client.get(f"/literature/{lit_id}")
+    # Three ~850 byte entries do not fit in 2000 bytes; the least recently read one is evicted.
+    stats = client.get("/metrics").json()["content_cache"]
+    assert (stats["entries"], stats["evictions"]) == (2, 1)
+    assert stats["bytes"] <= 2000
+
+    client.get(f"/literature/{ids[2]}")
+    client.put(f"/literature/{ids[2]}", json={"content": "revised", "change_reason": "edit"})
+    assert client.get(f"/literature/{ids[2]}").json()["content"] == "revised"
+    stats = client.get("/metrics").json()["content_cache"]
+    assert (stats["hits"], stats["misses"], stats["invalidations"]) == (1, 4, 1)
+
+
+def test_digital_library_versions_are_delta_compressed(tmp_path, monkeypatch):
+    dl_main = load_digital_library(monkeypatch, tmp_path, VERSION_SNAPSHOT_INTERVAL="5")
+    client = TestClient(dl_main.app)
+    lines = [f"Paragraph {n}: observations of soil respiration across plots.\n" for n in range(200)]
+    lit = client.post("/literature", json={"title": "Field notes", "content": "".join(lines)}).json()
+
+    # A legacy full-copy version row written before delta storage existed.
+    with dl_main.SessionLocal() as db:
+        legacy = dl_main.cipher.encrypt(b"draft zero\n").decode()
+        db.add(dl_main.LiteratureVersion(literature_id=lit["id"], content=legacy, change_reason="legacy", changed_by="user"))
+        db.commit()
+
+    history = []
+    for n in range(30):
+        history.append("".join(lines))
+        lines[n * 3] = f"Paragraph {n * 3}: revised in edit {n}.\n"
+        response = client.put(f"/literature/{lit['id']}", json={"content": "".join(lines), "change_reason": f"edit {n}"})
+        assert response.status_code == 200
+
+    with dl_main.SessionLocal() as db:
+        stored = [v.content for v in db.query(dl_main.LiteratureVersion).order_by(dl_main.LiteratureVersion.id)]
+    full_copy_bytes = sum(len(dl_main.cipher.encrypt(text.encode())) for text in history)
+    assert sum(len(c) for c in stored[1:]) * 10 < full_copy_bytes
+    assert sum(c.startswith(dl_main.VERSION_SNAPSHOT) for c in stored) == 6
+
+    assert client.get(f"/literature/{lit['id']}/versions/1").json()["content"] == "draft zero\n"
+    for number in (2, 6, 7, 19, 31):
+        version = client.get(f"/literature/{lit['id']}/versions/{number}").json()
+        assert version["content"] == history[number - 2]
+        assert version["change_reason"] == f"edit {number - 2}"
+    assert client.get(f"/literature/{lit['id']}/versions/32").status_code == 404
+    assert client.get(f"/literature/{lit['id']}/versions/0").status_code == 404
+    versions = client.get(f"/literature/{lit['id']}/map").json()["versions"]
+    assert [v["version"] for v in versions] == list(range(1, 32))
+
+
+def test_digital_library_graph_walks_k_hops_with_cycles(tmp_path, monkeypatch):
+    dl_main = load_digital_library(monkeypatch, tmp_path)
+    client = TestClient(dl_main.app)
+    ids = [client.post("/literature", json={"title": f"N{n}", "content": "c"}).json()["id"] for n in range(6)]
+    a, b, c, d, e, f = ids
+    for src, dst, kind in [(a, b, "cites"), (b, c, "cites"), (c, a, "cites"), (c, d, "related"), (d, e, "cites"), (a, f, "redacted_from")]:
+        client.post(f"/literature/{src}/link", json={"linked_id": dst, "link_type": kind})
+
+    graph = client.get(f"/literature/{a}/graph", params={"depth": 3}).json()
+    assert {n["id"]: n["depth"] for n in graph["nodes"]} == {a: 0, b: 1, f: 1, c: 2, d: 3}
+    assert [e_["cycle"] for e_ in graph["edges"] if e_["source"] == c and e_["target"] == a] == [True]
+    assert not graph["truncated"]
+
+    cites = client.get(f"/literature/{a}/graph", params={"depth": 5, "types": "cites"}).json()
+    assert {n["id"] for n in cites["nodes"]} == {a, b, c}
+    limited = client.get(f"/literature/{a}/graph", params={"depth": 5, "max_nodes": 2}).json()
+    assert limited["truncated"] and len(limited["nodes"]) == 2
+
+    # Served from cache until a new link invalidates it.
+    client.get(f"/literature/{a}/graph", params={"depth": 3})
+    assert client.get("/metrics").json()["graph_cache"]["hits"] == 1
+    client.post(f"/literature/{f}/link", json={"linked_id": e, "link_type": "cites"})
+    assert e in {n["id"] for n in client.get(f"/literature/{a}/graph", params={"depth": 3}).json()["nodes"]}
+    assert client.get("/literature/99999/graph").status_code == 404
+
+    # Cross links between branches of an acyclic graph are not cycles.
+    r, x, y = [client.post("/literature", json={"title": t, "content": "c"}).json()["id"] for t in "RXY"]
+    for src, dst in [(r, x), (r, y), (y, x)]:
+        client.post(f"/literature/{src}/link", json={"linked_id": dst, "link_type": "cites"})
+    acyclic = client.get(f"/literature/{r}/graph", params={"depth": 3}).json()
+    assert len(acyclic["edges"]) == 3 and not any(e_["cycle"] for e_ in acyclic["edges"])
+
+
+def test_digital_library_currency_audit_pages_and_buckets(tmp_path, monkeypatch):
+    dl_main = load_digital_library(monkeypatch, tmp_path)
+    client = TestClient(dl_main.app)
+    now = dl_main.datetime.utcnow().replace(microsecond=0)
+    # Docs 1 and 2 share a currency date, so the cursor has to break ties on id.
+    for n, days in enumerate([400, 800, 800, 1500, 3000, 10]):
+        stamp = (now - dl_main.timedelta(days=days)).isoformat()
+        client.post("/literature", json={"title": f"Doc {n}", "content": "c", "currency_date": stamp})
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"after": cursor} if cursor else {})}
+        page = client.get("/literature/currency", params=params).json()
+        seen.extend(item["title"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert seen == ["Doc 4", "Doc 3", "Doc 1", "Doc 2", "Doc 0"]
+    assert client.get("/literature/currency", params={"after": "bogus"}).status_code == 422
+
+    buckets = client.get("/literature/currency/buckets").json()["buckets"]
+    assert buckets == {"0-1y": 1, "1-2y": 1, "2-5y": 3, "5y+": 1, "undated": 0}
+    client.post("/literature", json={"title": "Fresh", "content": "c"})
+    assert client.get("/literature/currency/buckets").json()["buckets"]["0-1y"] == 2
+
+
+def test_digital_library_provenance_events_query_and_backfill(tmp_path, monkeypatch):
+    dl_main = load_digital_library(monkeypatch, tmp_path)
+    client = TestClient(dl_main.app)
+    a = client.post("/literature", json={"title": "A", "content": "a", "redacted": True, "redaction_reason": "PII"}).json()
+    b = client.post("/literature", json={"title": "B", "content": "b", "changed_by": "importer"}).json()
+    for n, who in enumerate(["alice", "bob", "alice"]):
+        client.put(f"/literature/{a['id']}", json={"content": f"a{n}", "change_reason": f"fix {n}", "changed_by": who})
+    client.post(f"/literature/{a['id']}/link", json={"linked_id": b["id"], "link_type": "cites"})
+
+    assert json.loads(client.get(f"/literature/{a['id']}").json()["provenance"])["changed_by"] == "alice"
+    alice = client.get("/provenance", params={"changed_by": "alice"}).json()["items"]
+    assert [e["reason"] for e in alice] == ["fix 2", "fix 0"]
+    assert client.get("/provenance", params={"action": "redacted"}).json()["items"][0]["reason"] == "PII"
+    assert client.get("/provenance", params={"action": "linked"}).json()["items"][0]["details"] == {
+        "linked_id": b["id"], "link_type": "cites",
+    }
+
+    seen, cursor = [], None
+    while True:
+        page = client.get("/provenance", params={"literature_id": a["id"], "limit": 2, **({"after": cursor} if cursor else {})}).json()
+        seen.extend(e["action"] for e in page["items"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert sorted(seen) == ["created", "linked", "redacted", "updated", "updated", "updated"]
+
+    # Rows written before the event table existed are recovered from versions and the legacy repr.
+    with dl_main.SessionLocal() as db:
+        legacy = dl_main.Literature(title="Old", content=dl_main.cipher.encrypt(b"x").decode(),
+                                    redacted=str({"redacted": True, "reason": "legal"}))
+        db.add(legacy)
+        db.flush()
+        db.add(dl_main.LiteratureVersion(literature_id=legacy.id, content="", change_reason="old edit", changed_by="carol"))
+        db.commit()
+        legacy_id = legacy.id
+    assert client.post("/admin/provenance/backfill").json() == {"version_events": 1, "created_events": 1}
+    assert client.post("/admin/provenance/backfill").json() == {"version_events": 0, "created_events": 0}
+    actions = {e["action"]: e for e in client.get("/provenance", params={"literature_id": legacy_id}).json()["items"]}
+    assert actions["updated"]["changed_by"] == "carol" and actions["redacted"]["reason"] == "legal"
+
+
+def load_ecological_eval(monkeypatch, tmp_path, **env):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'eco.db'}")
+    monkeypatch.setenv("ENCRYPTION_KEY", Fernet.generate_key().decode())
+    monkeypatch.setenv("DISABLE_KAFKA_CONSUMER", "true")
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    return load_module(Path("services/ecological-eval/app/main.py"), "eco_main")
+
+
+def test_ecological_eval_filters_pages_and_streams(tmp_path, monkeypatch):
+    eco_main = load_ecological_eval(monkeypatch, tmp_path)
+    client = TestClient(eco_main.app)
+    start = datetime(2024, 1, 1)
+    with eco_main.SessionLocal() as db:
+        for n in range(12):
+            db.add(eco_main.EcoData(
+                location="Sydney" if n % 2 else "Perth",
+                metric="rain" if n % 3 else "temp",
+                value=float(n),
+                map_data=eco_main.cipher.encrypt(json.dumps({"lat": -30.0 - n, "lon": 150.0}).encode()).decode(),
+                timestamp=start + timedelta(days=n),
+            ))
+        db.commit()
+
+    params = {"location": "Sydney", "metric": "rain", "since": "2024-01-02T00:00:00", "limit": 2}
+    first = client.get("/eco-data", params=params)
+    assert [row["value"] for row in first.json()] == [1.0, 5.0]
+    assert first.json()[0]["map"] == {"lat": -31.0, "lon": 150.0}
+    second = client.get("/eco-data", params={**params, "after": first.headers["x-next-cursor"]})
+    assert [row["value"] for row in second.json()] == [7.0, 11.0]
+    assert "x-next-cursor" not in second.headers
+
+    ndjson = client.get("/eco-data/map", params={"metric": "temp", "until": "2024-01-07T00:00:00", "format": "ndjson"})
+    assert ndjson.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line)["value"] for line in ndjson.text.splitlines()] == [0.0, 3.0]
+    assert client.get("/eco-data", params={"after": "nope"}).status_code == 422
+
+    # Offset bounds are compared in UTC, as the stored naive timestamps are.
+    aware = client.get("/eco-data", params={"since": "2024-01-11T10:00:00+10:00"}).json()
+    assert [row["value"] for row in aware] == [10.0, 11.0]
+    listing = client.get("/openapi.json").json()["paths"]["/eco-data"]["get"]["responses"]["200"]
+    assert "EcoItem" not in json.dumps(listing)  # the body may be NDJSON, so no JSON schema is claimed
+
+
+def test_ecological_eval_map_decryption_fans_out_and_caches(tmp_path, monkeypatch):
+    for name, value in {"DECRYPT_PROCESSES": "2", "DECRYPT_PARALLEL_MIN": "8", "DECRYPT_CHUNK_SIZE": "3"}.items():
+        monkeypatch.setenv(name, value)
+    eco_main = load_ecological_eval(monkeypatch, tmp_path)
+    client = TestClient(eco_main.app)
+    with eco_main.SessionLocal() as db:
+        for n in range(10):
+            coords = json.dumps({"lat": float(n), "lon": 1.0}).encode()
+            db.add(eco_main.EcoData(location="L", metric="m", value=n, map_data=eco_main.cipher.encrypt(coords).decode()))
+        db.add(eco_main.EcoData(location="L", metric="m", value=99))
+        db.commit()
+
+    try:
+        first = client.get("/eco-data/map").json()
+        assert [p["map"].get("lat") for p in first] == [float(n) for n in range(10)] + [None]
+        assert client.get("/eco-data/map").json() == first
+        stats = client.get("/metrics").json()["map_cache"]
+        assert (stats["parallel_batches"], stats["misses"], stats["hits"], stats["size"]) == (1, 12, 10, 10)
+        assert eco_main.map_decryptor.pool._pool._mp_context.get_start_method() == "spawn"
+    finally:
+        eco_main.map_decryptor.shutdown()
+
+
+def test_ecological_eval_bbox_queries_use_spatial_index(tmp_path, monkeypatch):
+    eco_main = load_ecological_eval(monkeypatch, tmp_path)
+    client = TestClient(eco_main.app)
+    # A 10x10 grid of stations one degree apart, plus two readings at the same site.
+    for lat in range(-40, -30):
+        for lon in range(140, 150):
+            client.post("/eco-data", json={"location": f"{lat}:{lon}", "metric": "rain", "value": 1.0,
+                                           "map_coords": {"lat": lat + 0.5, "lon": lon + 0.5}})
+    client.post("/eco-data", json={"location": "twin", "metric": "rain", "value": 2.0,
+                                   "map_coords": {"lat": -35.5001, "lon": 145.5001}})
+
+    bbox = {"bbox": "143,-37,146,-35"}
+    # Before the tree is built, geohash cells give a superset that is filtered exactly after decryption.
+    coarse = client.get("/eco-data/map", params=bbox).json()
+    eco_main.spatial_index.ensure_built()
+    assert eco_main.spatial_index.ready
+    exact = client.get("/eco-data/map", params=bbox).json()
+    assert exact == coarse
+    assert len(exact) == 3 * 2 + 1
+    assert all(143 <= p["map"]["lon"] <= 146 and -37 <= p["map"]["lat"] <= -35 for p in exact)
+
+    # Points added after the build are found through the pending list; zoom collapses same-pixel points.
+    client.post("/eco-data", json={"location": "new", "metric": "rain", "value": 3.0,
+                                   "map_coords": {"lat": -36.0, "lon": 144.0}})
+    assert len(client.get("/eco-data/map", params=bbox).json()) == 8
+    assert len(client.get("/eco-data/map", params={**bbox, "zoom": 6}).json()) == 7
+    assert client.get("/eco-data/map", params={"bbox": "1,2,3"}).status_code == 422
+    # World-copy longitudes are wrapped and latitudes clamped; a box across the antimeridian must be split.
+    assert eco_main._parse_bbox("503,-37,506,-35") == (143, -37, 146, -35)
+    assert eco_main._parse_bbox("-200,-100,200,100") == (-180, -90, 180, 90)
+    assert eco_main._parse_bbox("170,-10,180,10") == (170, -10, 180, 10)
+    assert client.get("/eco-data/map", params={"bbox": "170,-10,190,10"}).status_code == 422
+    assert client.get("/eco-data/map", params={"bbox": "nan,-10,10,10"}).status_code == 422
+
+    assert eco_main.geohash(-33.8688, 151.2093, 5) == "r3gx2"
+
+
+def test_ecological_eval_spatial_fallbacks_keep_rows_queryable(tmp_path, monkeypatch):
+    monkeypatch.setenv("SPATIAL_MAX_POINTS", "2")
+    eco_main = load_ecological_eval(monkeypatch, tmp_path)
+    client = TestClient(eco_main.app)
+    with eco_main.SessionLocal() as db:
+        for n in range(4):
+            db.add(eco_main.EcoData(location="legacy", metric="rain", value=1.0,
+                                    map_data=eco_main.cipher.encrypt(json.dumps({"lat": -35.0, "lon": 145.0 + n}).encode()).decode()))
+        db.commit()
+
+    # Too many points for the tree: legacy rows still get geohash cells for the fallback path.
+    eco_main.spatial_index.ensure_built()
+    assert eco_main.spatial_index.disabled
+    assert client.get("/eco-data/tiles/0/0/0").status_code == 501
+    assert len(client.get("/eco-data/map", params={"bbox": "144,-36,149,-34"}).json()) == 4
+
+    # Pending points beyond the threshold are folded into the tree by a background rebuild.
+    index = eco_main.SpatialIndex(max_points=100, rebuild_threshold=1)
+    index.ensure_built()
+    for n in range(3):
+        index.add(100 + n, {"lat": -20.0, "lon": 130.0 + n})
+    assert sorted(index.query((129, -21, 140, -19))) == [100, 101, 102]
+    for _ in range(100):
+        if not index._rebuilding and not index._pending:
+            break
+        time.sleep(0.01)
+    assert index._pending == [] and sorted(index.query((129, -21, 140, -19))) == [100, 101, 102]
+
+
+def test_ecological_eval_cluster_tiles_update_incrementally(tmp_path, monkeypatch):
+    eco_main = load_ecological_eval(monkeypatch, tmp_path, CLUSTER_MAX_ZOOM="10")
+    client = TestClient(eco_main.app)
+
+    def post(lat, lon, metric, value):
+        client.post("/eco-data", json={"location": "site", "metric": metric, "value": value,
+                                       "map_coords": {"lat": lat, "lon": lon}})
+
+    post(-33.86, 151.20, "rain", 4.0)
+    post(-33.87, 151.21, "rain", 8.0)
+    post(-31.95, 115.86, "temp", 30.0)
+    assert client.get("/eco-data/tiles/0/0/0").status_code == 503
+    eco_main.spatial_index.ensure_built()
+
+    world = client.get("/eco-data/tiles/0/0/0").json()["clusters"]
+    assert sum(c["count"] for c in world) == 3
+    px, py = eco_main.web_mercator_pixel(-33.86, 151.20, 6)
+    sydney_tile = f"/eco-data/tiles/6/{px // 256}/{py // 256}"
+    [sydney] = client.get(sydney_tile).json()["clusters"]
+    assert sydney["count"] == 2
+    assert sydney["metrics"]["rain"] == {"count": 2, "mean": 6.0, "min": 4.0, "max": 8.0}
+    assert abs(sydney["lat"] + 33.865) < 1e-9
+
+    post(-33.865, 151.205, "temp", 21.0)
+    [sydney] = client.get(sydney_tile).json()["clusters"]
+    assert sydney["count"] == 3 and sydney["metrics"]["temp"]["max"] == 21.0
+    assert client.get("/eco-data/tiles/11/0/0").status_code == 422
+    assert client.get("/eco-data/tiles/2/4/0").status_code == 422
+
+
+def test_ecological_eval_rollups_serve_series(tmp_path, monkeypatch):
+    eco_main = load_ecological_eval(monkeypatch, tmp_path)
+    client = TestClient(eco_main.app)
+    start = datetime(2023, 1, 1)
+    with eco_main.SessionLocal() as db:
+        for n in range(365):
+            db.add(eco_main.EcoData(location="Perth" if n % 2 else "Sydney", metric="temp",
+                                    value=float(n), timestamp=start + timedelta(days=n, hours=n % 24)))
+        db.commit()
+    assert client.post("/admin/rollups/rebuild").json() == {"status": "rebuilt", "readings": 365, "buckets": 365 + 365 + 12 * 2}
+
+    year = {"metric": "temp", "since": "2023-01-01T00:00:00", "until": "2024-01-01T00:00:00"}
+    daily = client.get("/eco-data/series", params=year).json()
+    assert (daily["step"], daily["source"], len(daily["points"])) == ("day", "day", 365)
+    monthly = client.get("/eco-data/series", params={**year, "step": "month"}).json()["points"]
+    assert len(monthly) == 12 and monthly[0]["count"] == 31 and monthly[0]["min"] == 0.0 and monthly[0]["last"] == 30.0
+    [whole] = client.get("/eco-data/series", params={**year, "step": "year", "location": "Perth"}).json()["points"]
+    assert whole["count"] == 182 and whole["max"] == 363.0 and whole["mean"] == 182.0
+    assert client.get("/eco-data/series", params={**year, "step": "fortnight"}).status_code == 422
+
+    # Live inserts and consumed messages fold into the same buckets incrementally.
+    client.post("/eco-data", json={"location": "Hobart", "metric": "temp", "value": 4.0})
+    eco_main._persist_consumed({"location": "Hobart", "metric": "temp", "value": 9.0})
+    eco_main._persist_consumed({"location": "Hobart", "metric": "temp", "value": 1.0})
+    [today] = client.get("/eco-data/series", params={"metric": "temp", "location": "Hobart", "step": "day"}).json()["points"]
+    assert (today["count"], today["sum"], today["min"], today["max"], today["last"]) == (3, 14.0, 1.0, 9.0, 1.0)
+    before = client.get("/eco-data/series", params={**year, "step": "week"}).json()["points"]
+    client.post("/admin/rollups/rebuild")
+    assert client.get("/eco-data/series", params={**year, "step": "week"}).json()["points"] == before